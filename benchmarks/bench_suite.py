@@ -0,0 +1,173 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "homework1"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "homework3"))
+
+from company_index import CompanyIndex
+from company_store import CompanyStore
+from data_processing import load_company_data, preprocess_data
+from market_generator import generate_market, write_market
+from signals import calculate_signals
+from table_parser import parse_history_table
+from technical_indicators import calculate_indicators, calculate_indicators_batch
+
+INDICATORS = ['RSI', 'SMA_5', 'EMA_5', 'SMA_10', 'EMA_10', 'SMA_20', 'EMA_20', 'MACD', 'Signal_Line']
+
+# Issuers whose one-year history pages are parsed, and calendar days of rows merged per issuer in the
+# update benchmark (only the last MERGE_NEW_DAYS of them are new, the rest are updates)
+PARSE_ISSUERS = 10
+MERGE_DAYS = 30
+MERGE_NEW_DAYS = 10
+
+
+def measure(run, setup=None, repeat=3):
+    """
+    Wall-clock seconds of each of `repeat` calls of run(state), where state is what
+    setup() returns; setup is not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# The data_processing helpers report progress with print, which would flood the benchmark output
+def quiet(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def merge_setup(paths, work_dir, frame):
+    """
+    A copy of the store and the rows a routine update brings in: the last MERGE_DAYS days of
+    every issuer, of which all but the last MERGE_NEW_DAYS are already stored.
+    """
+    db_path = os.path.join(work_dir, "merge.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    shutil.copyfile(paths["db"], db_path)
+
+    newest = frame.groupby("CompanyCode")["Date"].transform("max")
+    update = frame[frame["Date"] > newest - pd.Timedelta(days=MERGE_DAYS)]
+    new_rows = update[update["Date"] > newest[update.index] - pd.Timedelta(days=MERGE_NEW_DAYS)]
+    store = CompanyStore(db_path)
+    with store.connection:
+        store.connection.executemany("DELETE FROM company_data WHERE CompanyCode = ? AND Date = ?",
+                                     zip(new_rows["CompanyCode"], new_rows["Date"].dt.strftime("%Y-%m-%d")))
+    return store, update
+
+
+def run_benchmarks(issuers, years, seed, repeat, work_dir):
+    data, market = generate_market(issuers, years, seed)
+    paths = write_market(data, work_dir)
+    raw = quiet(load_company_data, paths["csv"])
+    typed = quiet(preprocess_data, raw.copy())
+    typed["CompanyCode"] = typed["CompanyCode"].astype(str)
+    index = CompanyIndex(typed)
+    batch, _ = calculate_indicators_batch(typed)
+
+    last_day = market.end_date
+    first_day = last_day - pd.Timedelta(days=364)
+    pages = [market.history_page(code, first_day, last_day).encode("utf-8")
+             for code in market.codes[:min(issuers, PARSE_ISSUERS)]]
+
+    benchmarks = {
+        "load_csv": (lambda _: load_company_data(paths["csv"]), None),
+        "load_sqlite": (lambda _: load_company_data(paths["db"]), None),
+        "load_parquet": (lambda _: load_company_data(paths["parquet"]), None),
+        "preprocess_data": (lambda frame: quiet(preprocess_data, frame), lambda: raw.copy()),
+        "calculate_indicators_per_company": (
+            lambda _: [calculate_indicators(index.get(code)) for code in index.companies()], None),
+        "calculate_indicators_batch": (lambda _: calculate_indicators_batch(typed), None),
+        "calculate_signals": (lambda _: calculate_signals(batch, INDICATORS), None),
+        "parse_history_lxml": (lambda _: [parse_history_table(page, "AAA") for page in pages], None),
+        "parse_history_bs4": (lambda _: [parse_history_table(page, "AAA", parser="bs4") for page in pages], None),
+        "update_merge": (lambda state: (state[0].upsert(state[1]), state[0].close()),
+                         lambda: merge_setup(paths, work_dir, typed)),
+    }
+
+    results = {}
+    for name, (run, setup) in benchmarks.items():
+        timings = measure(run, setup, repeat)
+        results[name] = {"seconds": min(timings), "runs": timings}
+        print(f"  {name:<34} {min(timings) * 1000:10.2f} ms")
+
+    meta = {
+        "issuers": issuers, "years": years, "seed": seed, "repeat": repeat,
+        "rows": len(data), "html_pages": len(pages),
+        "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+        "machine": platform.machine(), "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(report, baseline, threshold):
+    """
+    Ratio of every benchmark's time to the baseline's. A benchmark is a regression when it is
+    more than `threshold` (0.2 = 20%) slower. Returns the names of the regressions.
+    """
+    if (report["meta"]["issuers"], report["meta"]["years"]) != (baseline["meta"]["issuers"], baseline["meta"]["years"]):
+        print("Warning: the baseline was measured at a different scale.")
+    regressions = []
+    print(f"  {'benchmark':<34} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["seconds"]
+        ratio = result["seconds"] / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<34} {before * 1000:8.2f}ms {result['seconds'] * 1000:8.2f}ms {ratio:6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline on a synthetic market.")
+    parser.add_argument("--issuers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json", help="where to save the results")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown against the baseline that counts as a regression")
+    parser.add_argument("--data-dir", help="keep the generated data here instead of a temporary directory")
+    args = parser.parse_args()
+
+    print(f"Benchmarking {args.issuers} issuers x {args.years} years (seed {args.seed})...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report = run_benchmarks(args.issuers, args.years, args.seed, args.repeat, args.data_dir or temp_dir)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions.")
@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "homework1"))
+
+from company_store import CompanyStore
+from mse_simulator import MarketSimulator
+from price_schema import normalize_company_data
+
+COLUMNS = ["CompanyCode", "Date", "LastTradePrice", "Max", "Min", "AvgPrice", "%Change",
+           "Volume", "TurnoverBESTMKD", "TurnoverTotalMKD"]
+
+# Fixed last day, so a run today and a run next month benchmark the same market
+END_DATE = date(2024, 12, 31)
+
+
+def format_column(values, decimals):
+    return [f"{value:,.{decimals}f}" for value in values.tolist()]
+
+
+def generate_market(issuers=50, years=10, seed=0, end_date=END_DATE):
+    """
+    Synthetic daily history in the shape of company_data.csv: one row per issuer and trading
+    day, dates as dd.mm.yyyy and numbers as the page text (e.g. "23,000.00"). The rows are
+    the ones mse_simulator.py serves for the same settings, so the same seed gives the same
+    market in the CSV and on the simulated pages.
+    """
+    market = MarketSimulator(issuers=issuers, years=years, news_pages=0, seed=seed, end_date=end_date)
+    frames = []
+    for code in market.codes[:issuers]:
+        days, prices, highs, lows, averages, changes, volumes, turnovers = market.history(code)
+        frames.append(pd.DataFrame({
+            "CompanyCode": code,
+            "Date": pd.DatetimeIndex(days).strftime("%d.%m.%Y"),
+            "LastTradePrice": format_column(prices, 2),
+            "Max": format_column(highs, 2),
+            "Min": format_column(lows, 2),
+            "AvgPrice": format_column(averages, 2),
+            "%Change": format_column(changes, 2),
+            "Volume": format_column(volumes, 0),
+            "TurnoverBESTMKD": format_column(turnovers, 0),
+            "TurnoverTotalMKD": format_column(turnovers, 0),
+        }))
+    return pd.concat(frames, ignore_index=True)[COLUMNS], market
+
+
+def write_market(data, output_dir):
+    """
+    Write the market as company_data.csv, company_data.db and the company_data.parquet
+    snapshot, the three sources data_processing.load_company_data reads. Returns their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, f"company_data.{name}") for name in ("csv", "db", "parquet")}
+    data.to_csv(paths["csv"], index=False)
+
+    typed = normalize_company_data(data.copy())
+    typed["CompanyCode"] = typed["CompanyCode"].astype(str)
+    if os.path.exists(paths["db"]):
+        os.remove(paths["db"])
+    store = CompanyStore(paths["db"])
+    store.upsert(typed)
+    store.export_snapshot(paths["parquet"])
+    store.close()
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic company_data.csv/.db/.parquet.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--issuers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data, _ = generate_market(args.issuers, args.years, args.seed)
+    paths = write_market(data, args.output_dir)
+    print(f"{len(data)} rows for {data['CompanyCode'].nunique()} issuers written to {', '.join(paths.values())}.")
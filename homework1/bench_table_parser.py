@@ -0,0 +1,56 @@
+import glob
+import os
+import timeit
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from table_parser import parse_history_table
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+# The original per-cell BeautifulSoup loop with a pd.to_datetime call per row, kept as the baseline
+def parse_legacy(content, company_code):
+    company_data = []
+    table = BeautifulSoup(content, 'html.parser').select_one('table.table')
+    if table:
+        for row in table.find_all('tr')[1:]:
+            cells = row.find_all('td')
+            if len(cells) >= 9:
+                company_data.append({
+                    "CompanyCode": company_code,
+                    "Date": pd.to_datetime(cells[0].text.strip()).strftime("%d.%m.%Y"),
+                    "LastTradePrice": cells[1].text.strip(),
+                    "Max": cells[2].text.strip(),
+                    "Min": cells[3].text.strip(),
+                    "AvgPrice": cells[4].text.strip(),
+                    "%Change": cells[5].text.strip(),
+                    "Volume": cells[6].text.strip(),
+                    "TurnoverBESTMKD": cells[7].text.strip(),
+                    "TurnoverTotalMKD": cells[8].text.strip()
+                })
+    return company_data
+
+
+def benchmark(content, repeat=5, number=10):
+    parsers = {
+        "legacy bs4": lambda: parse_legacy(content, "ALK"),
+        "bs4 fallback": lambda: parse_history_table(content, "ALK", parser="bs4"),
+        "lxml": lambda: parse_history_table(content, "ALK"),
+    }
+    return {name: min(timeit.repeat(func, repeat=repeat, number=number)) / number
+            for name, func in parsers.items()}
+
+
+if __name__ == '__main__':
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            content = f.read()
+        rows = len(parse_history_table(content, "ALK"))
+        print(f"{os.path.basename(path)} ({rows} rows, {len(content) / 1024:.0f} KiB)")
+
+        timings = benchmark(content)
+        baseline = timings["legacy bs4"]
+        for name, seconds in timings.items():
+            print(f"  {name:<14} {seconds * 1000:8.2f} ms  {baseline / seconds:5.1f}x")
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from price_schema import FLOAT_COLUMNS, INT_COLUMNS, parse_numbers
+from table_parser import HISTORY_COLUMNS
+
+DB_PATH = "company_data.db"
+SNAPSHOT_PATH = "company_data.parquet"
+
+STORE_COLUMNS = ["CompanyCode"] + HISTORY_COLUMNS
+
+CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS company_data (
+    CompanyCode TEXT NOT NULL,
+    Date TEXT NOT NULL,
+    LastTradePrice REAL,
+    Max REAL,
+    Min REAL,
+    AvgPrice REAL,
+    "%Change" REAL,
+    Volume INTEGER,
+    TurnoverBESTMKD INTEGER,
+    TurnoverTotalMKD INTEGER,
+    PRIMARY KEY (CompanyCode, Date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS companies (
+    CompanyCode TEXT PRIMARY KEY,
+    Company TEXT
+);
+"""
+
+
+# Column names written by the old StockExcUpdating
+LEGACY_COLUMNS = {
+    "Last Trade Price": "LastTradePrice",
+    "Avg. Price": "AvgPrice",
+    "% Change": "%Change",
+    "Turnover BEST (denars)": "TurnoverBESTMKD",
+    "Total Turnover (denars)": "TurnoverTotalMKD",
+}
+
+
+def quote(column):
+    return f'"{column}"'
+
+
+UPSERT_SQL = (
+    f"INSERT INTO company_data ({', '.join(quote(c) for c in STORE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in STORE_COLUMNS)}) "
+    f"ON CONFLICT (CompanyCode, Date) DO UPDATE SET "
+    + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in HISTORY_COLUMNS[1:])
+)
+
+
+class CompanyStore:
+    """
+    SQLite store for the daily history, one row per (CompanyCode, Date).
+
+    Dates are stored as YYYY-MM-DD text so range queries use the primary key index.
+    Writes are upserts batched in a single transaction, so an update run costs time
+    in proportion to the rows it brings in rather than to the stored history.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(CREATE_TABLES)
+
+    def close(self):
+        self.connection.close()
+
+    def upsert(self, frame):
+        """
+        Insert or replace the rows of a typed history frame, as returned by table_parser.
+        """
+        if frame.empty:
+            return 0
+        frame = frame[STORE_COLUMNS]
+        dates = pd.to_datetime(frame["Date"]).dt.strftime("%Y-%m-%d")
+        columns = [frame["CompanyCode"].astype(str).tolist(), dates.tolist()]
+        for name in HISTORY_COLUMNS[1:]:
+            values = frame[name]
+            if values.dtype == "float32":
+                # sqlite3 cannot bind the float32 prices of price_schema. Going through the shortest
+                # decimal text keeps 25041.46 as 25041.46 instead of 25041.4609375.
+                values = values.astype(str).astype("float64")
+            elif name not in INT_COLUMNS:
+                values = values.astype("float64")
+            values = values.astype(object).where(values.notna(), None)
+            columns.append([int(v) if v is not None and name in INT_COLUMNS else v for v in values])
+        with self.connection:
+            self.connection.executemany(UPSERT_SQL, zip(*columns))
+        return len(frame)
+
+    def upsert_companies(self, company_links):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO companies (Company, CompanyCode) VALUES (?, ?) "
+                "ON CONFLICT (CompanyCode) DO UPDATE SET Company = excluded.Company",
+                company_links)
+
+    def last_dates(self):
+        """
+        Newest stored date per company, as a frame with CompanyCode and Date columns.
+        """
+        frame = pd.read_sql_query(
+            "SELECT CompanyCode, MAX(Date) AS Date FROM company_data GROUP BY CompanyCode", self.connection)
+        frame["Date"] = pd.to_datetime(frame["Date"], format="%Y-%m-%d")
+        return frame
+
+    def read_frame(self, company_code=None, start_date=None, end_date=None):
+        query = "SELECT * FROM company_data"
+        conditions, params = [], []
+        if company_code is not None:
+            conditions.append("CompanyCode = ?")
+            params.append(company_code)
+        if start_date is not None:
+            conditions.append("Date >= ?")
+            params.append(pd.Timestamp(start_date).strftime("%Y-%m-%d"))
+        if end_date is not None:
+            conditions.append("Date <= ?")
+            params.append(pd.Timestamp(end_date).strftime("%Y-%m-%d"))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        frame = pd.read_sql_query(query + " ORDER BY CompanyCode, Date", self.connection, params=params)
+        frame["Date"] = pd.to_datetime(frame["Date"], format="%Y-%m-%d")
+        return frame
+
+    def company_codes(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT CompanyCode FROM company_data")]
+
+    def export_snapshot(self, root=SNAPSHOT_PATH, company_codes=None):
+        """
+        Write the typed columnar snapshot read by the analysis apps, one Parquet
+        partition per company (root/CompanyCode=ALK/part-0.parquet).
+
+        Only the given companies are rewritten; the whole store is exported when the
+        snapshot does not exist yet or no companies are given. Each partition is written
+        to a hidden temporary file and moved into place, so readers never see a partial file.
+        """
+        if company_codes is None or not os.path.exists(root):
+            company_codes = self.company_codes()
+        for company_code in company_codes:
+            frame = self.read_frame(company_code).drop(columns=["CompanyCode"])
+            partition_dir = os.path.join(root, f"CompanyCode={company_code}")
+            os.makedirs(partition_dir, exist_ok=True)
+            temp_path = os.path.join(partition_dir, ".part-0.parquet.tmp")
+            frame.to_parquet(temp_path, index=False)
+            os.replace(temp_path, os.path.join(partition_dir, "part-0.parquet"))
+        return len(company_codes)
+
+    def import_csv(self, csv_path, date_format="%d.%m.%Y"):
+        """
+        One-off migration of a company_data.csv written by the previous versions of the scrapers.
+        """
+        frame = pd.read_csv(csv_path, dtype=str, low_memory=False)
+        frame = frame.rename(columns=LEGACY_COLUMNS)
+        frame["Date"] = pd.to_datetime(frame["Date"], format=date_format, errors="coerce")
+        frame = frame.dropna(subset=["Date"])
+        for name in FLOAT_COLUMNS:
+            frame[name] = parse_numbers(frame[name]).values
+        for name in INT_COLUMNS:
+            frame[name] = parse_numbers(frame[name]).fillna(0).astype("int64").values
+        return self.upsert(frame)
+
+
+def open_store(path=DB_PATH, csv_path="company_data.csv"):
+    """
+    Open the store, importing an existing CSV the first time the database is created.
+    """
+    is_new = not os.path.exists(path)
+    store = CompanyStore(path)
+    if is_new and csv_path and os.path.exists(csv_path):
+        print(f"Importing existing rows from {csv_path}...")
+        print(f"Imported {store.import_csv(csv_path)} rows into {path}.")
+    return store
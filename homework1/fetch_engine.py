@@ -0,0 +1,113 @@
+import asyncio
+import os
+import random
+import time
+
+import aiohttp
+
+# Tunables, overridable from the environment so a run can be throttled without code changes
+MAX_CONCURRENCY = int(os.environ.get("MSE_CONCURRENCY", 20))
+REQUESTS_PER_SECOND = float(os.environ.get("MSE_RATE_LIMIT", 10))
+MAX_RETRIES = int(os.environ.get("MSE_RETRIES", 3))
+
+# Site the scrapers talk to; point it at mse_simulator.py to measure a run without the network
+MSE_BASE_URL = os.environ.get("MSE_BASE_URL", "https://www.mse.mk").rstrip("/")
+BACKOFF_SECONDS = 0.5
+REQUEST_TIMEOUT = 30
+
+# Statuses worth retrying; anything else that is not 200 is treated as a permanent failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Rate limiter that allows `rate` requests per second with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchEngine:
+    """
+    Fetches many pages over one shared keep-alive session.
+
+    At most `concurrency` requests are in flight, requests are started at no more than
+    `rate` per second (None disables the limit) and failed requests are retried with
+    exponential backoff and jitter. Parsing is handed to a worker thread so the event
+    loop keeps the connections busy while pages are being parsed.
+    """
+
+    def __init__(self, concurrency=MAX_CONCURRENCY, rate=REQUESTS_PER_SECOND, retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, timeout=REQUEST_TIMEOUT, headers=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = headers or {"User-Agent": "Mozilla/5.0"}
+
+    async def _fetch(self, session, semaphore, bucket, url):
+        for attempt in range(self.retries + 1):
+            if bucket:
+                await bucket.acquire()
+            try:
+                async with semaphore:
+                    async with session.get(url) as response:
+                        if response.status == 200:
+                            return await response.read()
+                        if response.status not in RETRY_STATUSES:
+                            print(f"Request failed with status {response.status}: {url}")
+                            return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Request error ({e.__class__.__name__}) on attempt {attempt + 1}: {url}")
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        print(f"Giving up after {self.retries + 1} attempts: {url}")
+        return None
+
+    async def _fetch_job(self, session, semaphore, bucket, job, parse):
+        content = await self._fetch(session, semaphore, bucket, job[-1])
+        if content is None or parse is None:
+            return job, content
+        loop = asyncio.get_running_loop()
+        return job, await loop.run_in_executor(None, parse, job, content)
+
+    async def fetch_all_async(self, jobs, parse=None):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate) if self.rate else None
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        results = []
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            tasks = [asyncio.ensure_future(self._fetch_job(session, semaphore, bucket, job, parse)) for job in jobs]
+            for task in asyncio.as_completed(tasks):
+                results.append(await task)
+        return results
+
+    def fetch_all(self, jobs, parse=None):
+        """
+        Fetch every job and return a list of (job, result) pairs in completion order.
+
+        Each job is a tuple whose last element is the URL. When `parse` is given it is
+        called as parse(job, content) and its return value is the result; otherwise the
+        raw response body is returned. Failed jobs have a result of None.
+        """
+        return asyncio.run(self.fetch_all_async(jobs, parse))
@@ -0,0 +1,325 @@
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+# Letters used for synthetic issuer codes; the scrapers skip names that start with 'E' or contain digits
+CODE_LETTERS = "ABCDFGHIJKLMNOPRSTUVZ"
+NEWS_PER_PAGE = 10
+
+HISTORY_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8" />
+    <title>Symbol history - Macedonian Stock Exchange</title>
+</head>
+<body>
+<div class="container">
+    <form method="get" action="/en/stats/symbolhistory/{code}">
+        <select id="Code" name="Code">{options}</select>
+        <input id="FromDate" name="FromDate" type="text" value="{from_date}" />
+        <input id="ToDate" name="ToDate" type="text" value="{to_date}" />
+    </form>
+    <div class="table-responsive">
+        <table id="resultsTable" class="table table-bordered dataTable">
+            <thead>
+                <tr>
+                    <th>Date</th><th>Last trade price</th><th>Max</th><th>Min</th><th>Avg. Price</th><th>%chg.</th><th>Volume</th><th>Turnover in BEST in denars</th><th>Total turnover in denars</th>
+                </tr>
+            </thead>
+            <tbody>
+{rows}
+            </tbody>
+        </table>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+NEWS_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8" />
+    <title>Latest news - Macedonian Stock Exchange</title>
+</head>
+<body>
+<div class="container">
+{rows}
+</div>
+</body>
+</html>
+"""
+
+
+def issuer_codes(count):
+    """
+    Deterministic issuer codes (AAA, AAB, ...) followed by a few bond codes that the
+    scrapers are expected to skip.
+    """
+    codes = ["".join(letters) for letters in itertools.islice(itertools.product(CODE_LETTERS, repeat=3), count)]
+    return codes + [f"RMDEN{number}" for number in range(1, 4)] + ["EUROBOND"]
+
+
+def format_number(value, decimals=2):
+    return f"{value:,.{decimals}f}"
+
+
+def format_page_date(day):
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+class MarketSimulator:
+    """
+    Synthetic market behind the simulator: `issuers` companies with `years` of daily
+    history ending at end_date, and `news_pages` pages of news. Everything is derived
+    from the seed, so two simulators with the same settings serve the same pages.
+    """
+
+    def __init__(self, issuers=50, years=10, news_pages=20, seed=0, end_date=None):
+        self.seed = seed
+        self.end_date = end_date or date.today()
+        self.start_date = self.end_date - timedelta(days=365 * years)
+        self.codes = issuer_codes(issuers)
+        self.news_pages = news_pages
+        self.options = "".join(f'<option value="{code}">{code}</option>' for code in self.codes)
+        self.history = lru_cache(maxsize=None)(self._history)
+
+    def _history(self, code):
+        """
+        Rows of one issuer, oldest first: a random walk over business days, with less
+        liquid issuers skipping some of them.
+        """
+        rng = np.random.default_rng([self.seed, zlib.crc32(code.encode())])
+        days = np.arange(np.datetime64(self.start_date), np.datetime64(self.end_date) + 1, dtype="datetime64[D]")
+        days = days[np.is_busday(days)]
+        days = days[rng.random(len(days)) < rng.uniform(0.3, 1.0)]
+
+        prices = rng.uniform(100, 30000) * np.exp(np.cumsum(rng.normal(0, 0.015, len(days))))
+        prices = np.round(prices, 2)
+        previous = np.concatenate(([prices[0]], prices[:-1])) if len(prices) else prices
+        highs = np.round(prices * (1 + rng.uniform(0, 0.02, len(days))), 2)
+        lows = np.round(prices * (1 - rng.uniform(0, 0.02, len(days))), 2)
+        averages = np.round((highs + lows) / 2, 2)
+        changes = np.round((prices / previous - 1) * 100, 2)
+        volumes = rng.integers(1, 2000, len(days))
+        turnovers = np.round(averages * volumes).astype("int64")
+        return days, prices, highs, lows, averages, changes, volumes, turnovers
+
+    def history_rows(self, code, from_date, to_date):
+        """
+        Table rows of one issuer between two dates, newest first like the real site.
+        """
+        if code not in self.codes:
+            return []
+        days, *columns = self.history(code)
+        low = int(np.searchsorted(days, np.datetime64(from_date), side="left"))
+        high = int(np.searchsorted(days, np.datetime64(to_date), side="right"))
+        rows = []
+        for i in range(high - 1, low - 1, -1):
+            price, high_price, low_price, average, change, volume, turnover = (column[i] for column in columns)
+            cells = [format_page_date(days[i].astype(object)), format_number(price), format_number(high_price),
+                     format_number(low_price), format_number(average), format_number(change),
+                     format_number(volume, 0), format_number(turnover, 0), format_number(turnover, 0)]
+            rows.append("                <tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+        return rows
+
+    def history_page(self, code, from_date, to_date):
+        return HISTORY_PAGE.format(code=escape(code), options=self.options,
+                                   from_date=format_page_date(from_date), to_date=format_page_date(to_date),
+                                   rows="\n".join(self.history_rows(code, from_date, to_date)))
+
+    def news_page(self, page):
+        """
+        One page of the latest news; articles are about a day apart, newest first, and
+        pages past the last one are empty.
+        """
+        rows = []
+        if 1 <= page <= self.news_pages:
+            for number in range((page - 1) * NEWS_PER_PAGE, page * NEWS_PER_PAGE):
+                published = self.end_date - timedelta(days=number * 36 // 30)
+                code = self.codes[zlib.crc32(f"{self.seed}-{number}".encode()) % len(self.codes)]
+                title = f"Notification from {code} AD Skopje no. {number}"
+                link = f"/en/news/{published:%d/%m/%Y}/notification-from-{code.lower()}-{number}"
+                rows.append(f'<div class="row"><div class="col-md-1">{format_page_date(published)}</div>'
+                            f'<div class="col-md-11"><a href="{link}">{escape(title)}</a></div></div>')
+        return NEWS_PAGE.format(rows="\n".join(rows))
+
+
+class Throttle:
+    """
+    Token bucket shared by all connections: `rate` requests per second with bursts of
+    up to `burst`. Requests over the limit are answered with 429.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pooled sessions in the scrapers reuse connections like they would against the site
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            self.send_body(200, json.dumps(server.snapshot_stats()), "application/json")
+            return
+
+        server.count("requests")
+        if server.throttle is not None and not server.throttle.allow():
+            server.count("throttled")
+            self.send_body(429, "Too Many Requests", "text/plain", {"Retry-After": "1"})
+            return
+        delay = server.latency + server.jitter * server.random()
+        if delay > 0:
+            time.sleep(delay)
+        if server.random() < server.error_rate:
+            server.count("errors")
+            self.send_body(503, "Service Unavailable", "text/plain")
+            return
+
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if parts[:3] == ["en", "stats", "symbolhistory"] and len(parts) == 4:
+            to_date = parse_query_date(query.get("toDate"), server.market.end_date)
+            from_date = parse_query_date(query.get("fromDate"), to_date - timedelta(days=365))
+            body = server.market.history_page(parts[3], from_date, to_date)
+        elif parts == ["en", "news", "latest"]:
+            body = server.market.news_page(int(query.get("page", ["1"])[0]))
+        else:
+            server.count("not_found")
+            self.send_body(404, "Not Found", "text/plain")
+            return
+        server.count("served")
+        self.send_body(200, body)
+
+
+def parse_query_date(values, default):
+    if not values or not values[0]:
+        return default
+    return datetime.strptime(values[0], "%Y-%m-%d").date()
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """
+    HTTP server for a MarketSimulator. Each request waits latency plus up to jitter
+    seconds, fails with 503 at error_rate and is throttled to rate_limit requests per
+    second (None for no limit). Request counters are served at /__stats.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, market, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None,
+                 burst=None, seed=0, verbose=False):
+        super().__init__(address, SimulatorHandler)
+        self.market = market
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle = Throttle(rate_limit, burst) if rate_limit else None
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "served": 0, "errors": 0, "throttled": 0, "not_found": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def snapshot_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def start_simulator(port=0, host="127.0.0.1", **options):
+    """
+    Start a simulator in a background thread and return the server; point the scrapers at
+    server.base_url through MSE_BASE_URL and call server.shutdown() when done. Options are
+    those of MarketSimulator (issuers, years, news_pages, seed, end_date) and of
+    SimulatorServer.
+    """
+    market_options = {name: options.pop(name) for name in ("issuers", "years", "news_pages", "end_date")
+                      if name in options}
+    market = MarketSimulator(seed=options.get("seed", 0), **market_options)
+    server = SimulatorServer((host, port), market, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline stand-in for www.mse.mk with synthetic data.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--issuers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--news-pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end-date", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                        help="last day of history (default today)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering 429")
+    parser.add_argument("--burst", type=float, help="requests allowed at once under --rate-limit")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    market = MarketSimulator(args.issuers, args.years, args.news_pages, args.seed, args.end_date)
+    server = SimulatorServer((args.host, args.port), market, args.latency, args.jitter, args.error_rate,
+                             args.rate_limit, args.burst, args.seed, args.verbose)
+    print(f"Serving {len(market.codes)} issuers at {server.base_url}; set MSE_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    print(f"Requests: {server.snapshot_stats()}")
@@ -0,0 +1,54 @@
+import pandas as pd
+
+# In-memory schema of the daily history. Prices fit comfortably in float32, while volume and
+# turnover are whole numbers that can exceed the float32 mantissa and stay int64.
+FLOAT_COLUMNS = ['LastTradePrice', 'Max', 'Min', 'AvgPrice', '%Change']
+INT_COLUMNS = ['Volume', 'TurnoverBESTMKD', 'TurnoverTotalMKD']
+DATE_FORMAT = '%d.%m.%Y'
+
+# Values written by the earlier scrapers' format_number, e.g. 1.234,56, use a decimal comma: one or two digits follow the
+# last comma. Thousands separators in "2,989,691" are always followed by three digits.
+DECIMAL_COMMA_PATTERN = r',\d{1,2}$'
+
+
+def parse_numbers(values):
+    """
+    Parse locale-formatted numbers such as "2,989,691", "23,000.00" or "1.234,56" to float64.
+    Values that are already numeric are returned as they are.
+    """
+    values = pd.Series(values)
+    if values.empty or pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    text = values.astype(str).str.strip()
+    decimal_comma = text.str.contains(DECIMAL_COMMA_PATTERN, regex=True, na=False)
+    if decimal_comma.any():
+        text = text.where(~decimal_comma,
+                          text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    text = text.where(decimal_comma, text.str.replace(',', '', regex=False))
+    return pd.to_numeric(text, errors='coerce')
+
+
+def normalize_company_data(data, date_format=DATE_FORMAT):
+    """
+    Convert a raw history frame to the compact typed schema, once, at ingest time:
+    CompanyCode as a categorical, Date as datetime64, prices as float32 and volume and
+    turnover as int64. Columns that are missing from the frame are skipped.
+    """
+    if 'CompanyCode' in data.columns:
+        data['CompanyCode'] = data['CompanyCode'].astype('category')
+    if 'Date' in data.columns and not pd.api.types.is_datetime64_any_dtype(data['Date']):
+        data['Date'] = pd.to_datetime(data['Date'], format=date_format, errors='coerce')
+    for column in FLOAT_COLUMNS:
+        if column in data.columns and data[column].dtype != 'float32':
+            data[column] = parse_numbers(data[column]).astype('float32')
+    for column in INT_COLUMNS:
+        if column in data.columns and data[column].dtype != 'int64':
+            data[column] = parse_numbers(data[column]).fillna(0).round().astype('int64')
+    return data
+
+
+def memory_footprint(data):
+    """
+    Deep memory usage of a frame in bytes, including the Python strings of object columns.
+    """
+    return int(data.memory_usage(deep=True).sum())
@@ -0,0 +1,92 @@
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from price_schema import INT_COLUMNS, parse_numbers
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, BeautifulSoup's html.parser is used instead
+    lxml = None
+
+# Columns of the symbol history table, in the order they appear on the page
+HISTORY_COLUMNS = ["Date", "LastTradePrice", "Max", "Min", "AvgPrice", "%Change",
+                   "Volume", "TurnoverBESTMKD", "TurnoverTotalMKD"]
+
+# Dates on the English version of the site, e.g. 11/7/2024
+PAGE_DATE_FORMAT = "%m/%d/%Y"
+
+TABLE_XPATH = '//table[contains(concat(" ", normalize-space(@class), " "), " table ")]'
+
+
+def extract_rows_lxml(content):
+    tables = lxml.html.fromstring(content).xpath(TABLE_XPATH)
+    if not tables:
+        return []
+    rows = []
+    for tr in tables[0].iter("tr"):
+        cells = [td.text_content().strip() for td in tr.findall("td")]
+        if len(cells) >= len(HISTORY_COLUMNS):
+            rows.append(cells[:len(HISTORY_COLUMNS)])
+    return rows
+
+
+def extract_rows_bs4(content):
+    table = BeautifulSoup(content, "html.parser").select_one("table.table")
+    if not table:
+        return []
+    rows = []
+    for tr in table.find_all("tr"):
+        cells = [td.text.strip() for td in tr.find_all("td")]
+        if len(cells) >= len(HISTORY_COLUMNS):
+            rows.append(cells[:len(HISTORY_COLUMNS)])
+    return rows
+
+
+def parse_dates(values):
+    """
+    Vectorized date conversion; cells that do not match the page format are parsed one by one.
+    """
+    dates = pd.to_datetime(pd.Series(values), format=PAGE_DATE_FORMAT, errors="coerce")
+    missing = dates.isna()
+    if missing.any():
+        dates[missing] = [pd.to_datetime(value, errors="coerce") for value in pd.Series(values)[missing]]
+    return dates
+
+
+def rows_to_frame(rows, company_code):
+    columns = list(zip(*rows)) if rows else [()] * len(HISTORY_COLUMNS)
+    dates = parse_dates(columns[0])
+    data = {"CompanyCode": [company_code] * len(rows), "Date": dates.values}
+    for name, values in zip(HISTORY_COLUMNS[1:], columns[1:]):
+        numbers = parse_numbers(values)
+        if name in INT_COLUMNS:
+            data[name] = numbers.fillna(0).to_numpy(dtype="int64")
+        else:
+            data[name] = numbers.to_numpy(dtype="float64")
+    frame = pd.DataFrame(data)
+
+    invalid = dates.isna().values
+    if invalid.any():
+        for value in pd.Series(columns[0])[invalid]:
+            print(f"Error formatting date: {value}")
+        frame = frame[~invalid].reset_index(drop=True)
+    return frame
+
+
+def parse_history_table(content, company_code, parser=None):
+    """
+    Parse a symbol history page into a typed DataFrame.
+
+    Dates come back as datetime64, prices and %Change as float64 and volume and
+    turnover as int64. lxml is used when it is installed; parser="bs4" forces the
+    BeautifulSoup path, which is also the fallback when lxml cannot read the page.
+    """
+    rows = None
+    if parser != "bs4" and lxml is not None:
+        try:
+            rows = extract_rows_lxml(content)
+        except (ValueError, lxml.etree.ParserError) as e:
+            print(f"lxml could not parse page for {company_code}, falling back to BeautifulSoup: {e}")
+    if rows is None:
+        rows = extract_rows_bs4(content)
+    return rows_to_frame(rows, company_code)
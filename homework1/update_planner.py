@@ -0,0 +1,126 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# The symbol history page returns at most one year per request
+MAX_CHUNK_DAYS = 365
+HISTORY_YEARS = 10
+STATE_PATH = "update_state.json"
+
+
+class UpdatePlanner:
+    """
+    Plans which date ranges still have to be requested for each company.
+
+    For every company it keeps a high-watermark (the newest date already stored) and the
+    weekdays after it that are known to have no trades, learned from past empty responses.
+    Only weekdays after the watermark that are not known to be empty are requested, and
+    they are merged into as few requests as the one-year limit allows.
+
+    Ranges whose request failed are kept as pending and planned again first, so a later
+    range that succeeds and moves the watermark past them does not leave a gap.
+    """
+
+    def __init__(self, state_path=STATE_PATH):
+        self.state_path = state_path
+        self.watermarks = {}
+        self.non_trading = {}
+        self.pending = {}
+
+    @classmethod
+    def load(cls, state_path=STATE_PATH):
+        planner = cls(state_path)
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            planner.watermarks = {code: pd.Timestamp(day) for code, day in state.get("watermarks", {}).items()}
+            planner.non_trading = {code: {pd.Timestamp(day) for day in days}
+                                   for code, days in state.get("non_trading", {}).items()}
+            planner.pending = {code: {tuple(chunk) for chunk in chunks}
+                               for code, chunks in state.get("pending", {}).items()}
+        return planner
+
+    def save(self):
+        state = {
+            "watermarks": {code: day.strftime("%Y-%m-%d") for code, day in sorted(self.watermarks.items())},
+            "non_trading": {code: sorted(day.strftime("%Y-%m-%d") for day in days)
+                            for code, days in sorted(self.non_trading.items()) if days},
+            "pending": {code: sorted(chunks) for code, chunks in sorted(self.pending.items()) if chunks},
+        }
+        with open(self.state_path, "w") as f:
+            json.dump(state, f, indent=2)
+
+    def seed_from_frame(self, existing_df, date_format="%d.%m.%Y"):
+        """
+        Take watermarks from already stored rows for companies the planner has not seen yet.
+        """
+        if existing_df.empty:
+            return
+        dates = pd.to_datetime(existing_df["Date"], format=date_format, errors="coerce")
+        for code, last_date in dates.groupby(existing_df["CompanyCode"]).max().items():
+            if code not in self.watermarks and not pd.isna(last_date):
+                self.watermarks[code] = last_date.normalize()
+
+    def candidate_days(self, company_code, today):
+        watermark = self.watermarks.get(company_code)
+        if watermark is None:
+            start = today - timedelta(days=365 * HISTORY_YEARS)
+        else:
+            start = watermark + timedelta(days=1)
+        days = pd.bdate_range(start, today)
+        known_empty = self.non_trading.get(company_code)
+        if known_empty:
+            days = days[~days.isin(list(known_empty))]
+        return days
+
+    def plan(self, company_code, today=None):
+        """
+        Return the (start, end) ranges, as YYYY-MM-DD strings, that can hold new rows,
+        the pending ones first.
+        """
+        today = pd.Timestamp(today or datetime.now()).normalize()
+        days = self.candidate_days(company_code, today)
+        pending = sorted(self.pending.get(company_code, ()))
+        for start_date, end_date in pending:
+            days = days[(days < start_date) | (days > end_date)]
+
+        chunks = list(pending)
+        i = 0
+        while i < len(days):
+            limit = days[i] + timedelta(days=MAX_CHUNK_DAYS - 1)
+            j = days.searchsorted(limit, side="right") - 1
+            chunks.append((days[i].strftime("%Y-%m-%d"), days[j].strftime("%Y-%m-%d")))
+            i = j + 1
+        return chunks
+
+    def record_result(self, company_code, start_date, end_date, row_dates, today=None):
+        """
+        Update the watermark and learned empty days from one successful response.
+
+        Days of the current date are never learned as empty, the day's trading may not
+        be published yet.
+        """
+        today = pd.Timestamp(today or datetime.now()).normalize()
+        row_dates = pd.DatetimeIndex(pd.to_datetime(row_dates)).normalize()
+        watermark = self.watermarks.get(company_code)
+        if len(row_dates):
+            newest = row_dates.max()
+            if watermark is None or newest > watermark:
+                watermark = self.watermarks[company_code] = newest
+
+        self.pending.get(company_code, set()).discard((start_date, end_date))
+        requested = pd.bdate_range(start_date, min(pd.Timestamp(end_date), today - timedelta(days=1)))
+        empty = requested[~requested.isin(row_dates)]
+        known_empty = self.non_trading.setdefault(company_code, set())
+        known_empty.update(empty)
+        if watermark is not None:
+            # Days behind the watermark are never requested again
+            known_empty.difference_update([day for day in known_empty if day <= watermark])
+
+    def record_failure(self, company_code, start_date, end_date):
+        """
+        Keep a range whose request failed, to be requested again by the next plan.
+        """
+        self.pending.setdefault(company_code, set()).add((start_date, end_date))
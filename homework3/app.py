@@ -1,32 +1,60 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
 from flask import Flask, render_template, request, jsonify
-from datetime import datetime, timedelta
 import os
 
+from company_index import CompanyIndex
+from data_processing import find_data_path, load_company_data, preprocess_data
+from data_reloader import DataReloader, DataSnapshot
+from indicator_cache import IndicatorCache
+from resampling import build_bars
+from response_cache import ResponseCache
+from downsampling import chart_width, downsample_positions
+from signals import crossover_pairs, signal_series, summarize_signals
+
 app = Flask(__name__)
 
-# Path to the CSV file
-DATA_PATH = os.path.join("data", "company_data.csv")
+# Path to the columnar snapshot, the SQLite store, or the CSV file, whichever exists
+DATA_PATH = find_data_path()
 
 # Check if the file exists
 if not os.path.exists(DATA_PATH):
     raise FileNotFoundError(f"File not found: {DATA_PATH}")
 
-# Read CSV data
-data = pd.read_csv(DATA_PATH, low_memory=False)
 
-# Ensure the date is properly parsed
-if 'Date' in data.columns:
-    data['Date'] = pd.to_datetime(data['Date'], format='%d.%m.%Y')
-else:
-    raise ValueError("The 'Date' column is missing in the CSV file.")
+# Function to load one version of the data with everything the requests look up in it
+def build_snapshot(file_path, version, previous):
+    # Read the data, only the columns the analysis and the weekly and monthly bars use
+    data = load_company_data(file_path, columns=['CompanyCode', 'Date', 'LastTradePrice', 'Max', 'Min',
+                                                 'Volume', 'TurnoverBESTMKD', 'TurnoverTotalMKD'])
+
+    # Ensure the required columns are present
+    for column in ('Date', 'LastTradePrice'):
+        if column not in data.columns:
+            raise ValueError(f"The '{column}' column is missing in the data file.")
+
+    # Parse dates, prices and company codes once into the compact typed schema
+    data = preprocess_data(data)
+
+    # Contiguous, date-sorted rows per company, looked up by code
+    index = CompanyIndex(data)
+
+    # Weekly and monthly OHLCV bars, refreshed from the previous version's bars on a reload
+    bars = build_bars(index, previous.bars if previous is not None else None)
+
+    # Indicators persisted by technical_indicators.py next to the data file
+    return DataSnapshot(version, data, index, bars, IndicatorCache(os.path.dirname(file_path)))
+
 
-# Ensure 'LastTradePrice' is numeric
-if 'LastTradePrice' in data.columns:
-    data['LastTradePrice'] = pd.to_numeric(data['LastTradePrice'].str.replace(',', ''), errors='coerce')
-else:
-    raise ValueError("The 'LastTradePrice' column is missing in the CSV file.")
+# Serialized /analyze responses for the loaded version of the data, least recently used evicted first
+response_cache = ResponseCache(int(os.environ.get('ANALYZE_CACHE_SIZE', 128)))
+
+# The data is reloaded in the background when a scraper run rewrites the file
+reloader = DataReloader(DATA_PATH, build_snapshot, interval=int(os.environ.get('RELOAD_INTERVAL', 30)),
+                        on_reload=lambda snapshot: response_cache.set_version(snapshot.version))
+response_cache.set_version(reloader.snapshot.version)
+reloader.start()
 
 
 # Function to calculate RSI
@@ -85,7 +113,7 @@ def index():
 @app.route('/get_companies', methods=['GET'])
 def get_companies():
     try:
-        companies = data['CompanyCode'].drop_duplicates().tolist()
+        companies = reloader.snapshot.index.companies()
         return jsonify({"companies": companies})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -100,108 +128,86 @@ def analyze():
         # Get selected indicators from the form
         selected_indicators = request.form.getlist('indicators')
 
-        # Filter data by the selected company
-        company_data = data[data['CompanyCode'] == company]
+        # Width of the chart in pixels, which bounds how many points are worth sending
+        width = chart_width(request.form.get('width'))
 
-        if company_data.empty:
-            raise ValueError(f"No data available for the selected company: {company}")
+        # The data version this request works on, even if a reload swaps in a newer one meanwhile
+        snapshot = reloader.snapshot
+        company_index = snapshot.index
 
-        # Hardcoded current date for testing (today is fixed as 9th November 2024)
-        hardcoded_date = datetime(2024, 11, 7)
+        # Identical requests against the same data are answered from the response cache
+        cache_key = (company, timeframe, tuple(selected_indicators), width, snapshot.version)
+        cached_body = response_cache.get(cache_key)
+        if cached_body is not None:
+            return app.response_class(cached_body, mimetype='application/json', headers={'X-Cache': 'HIT'})
 
-        # Filter data based on timeframe
-        if timeframe == 'weekly':
-            last_week_start = hardcoded_date - timedelta(days=6)
-            filtered_data = company_data[
-                (company_data['Date'] >= last_week_start) & (company_data['Date'] <= hardcoded_date)]
+        # Look up the rows of the selected company
+        company_data = company_index.get(company)
 
-        elif timeframe == 'monthly':
-            last_month_start = hardcoded_date - timedelta(days=29)
-            filtered_data = company_data[
-                (company_data['Date'] >= last_month_start) & (company_data['Date'] <= hardcoded_date)]
+        if company_data.empty:
+            raise ValueError(f"No data available for the selected company: {company}")
 
+        if timeframe in snapshot.bars:
+            # Indicators over the precomputed weekly or monthly bars, with the close as the price
+            bars = snapshot.bars[timeframe].get(company).reset_index(drop=True)
+            indicators_df = calculate_indicators(bars.rename(columns={'Close': 'LastTradePrice'}))
         else:
-            filtered_data = company_data
+            # Indicators over the company's daily history, read from the indicator cache when it
+            # is up to date with the loaded rows
+            indicators_df = snapshot.indicator_cache.get(company, company_data, calculate_indicators)
 
-        if filtered_data.empty:
+        if indicators_df.empty:
             raise ValueError(f"No data available for the selected timeframe: {timeframe}")
 
-        # Calculate indicators for the filtered data
-        indicators_df = calculate_indicators(filtered_data)
+        # Count buy, sell, and hold signals, in total and per date
+        daily_signals = signal_series(indicators_df, selected_indicators)
+        signals_summary = summarize_signals(daily_signals)
 
-        # Count buy, sell, and hold signals
-        signals_summary = calculate_signals(indicators_df, selected_indicators)
+        # Downsample long histories to the chart width before building the figure, keeping the
+        # peaks of every line and the points where compared lines cross
+        plotted = [indicator for indicator in selected_indicators if indicator in indicators_df.columns]
+        positions = downsample_positions({indicator: indicators_df[indicator].to_numpy() for indicator in plotted},
+                                         width, crossover_pairs(plotted))
+        all_positions = np.unique(np.concatenate([np.arange(0)] + list(positions.values())))
+        chart_df = indicators_df.iloc[all_positions]
+        chart_signals = daily_signals.iloc[all_positions]
 
         # Generate Plotly graph using selected indicators
         fig = go.Figure()
 
-        for indicator in selected_indicators:
-            if indicator in indicators_df.columns:
-                fig.add_trace(go.Scatter(
-                    x=indicators_df['Date'],
-                    y=indicators_df[indicator],
-                    mode='lines',
-                    name=indicator
-                ))
+        for indicator in plotted:
+            points = indicators_df.iloc[positions[indicator]]
+            fig.add_trace(go.Scatter(
+                x=points['Date'],
+                y=points[indicator],
+                mode='lines',
+                name=indicator
+            ))
 
         graph_json = fig.to_json()
 
-        return jsonify({
+        response = jsonify({
             "graph": graph_json,
-            "signals": signals_summary
+            "signals": signals_summary,
+            "signal_series": {
+                "dates": chart_df['Date'].dt.strftime('%Y-%m-%d').tolist(),
+                "buy": chart_signals['buy'].tolist(),
+                "sell": chart_signals['sell'].tolist(),
+                "hold": chart_signals['hold'].tolist()
+            }
         })
+        if snapshot.version == response_cache.version:
+            response_cache.put(cache_key, response.get_data())
+        response.headers['X-Cache'] = 'MISS'
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def calculate_signals(indicators_df, selected_indicators):
-    """
-    Calculate buy, sell, and hold signals based on indicators.
-    """
-    buy_signals = 0
-    sell_signals = 0
-    hold_signals = 0
-
-    for _, row in indicators_df.iterrows():
-        # RSI Logic
-        if 'RSI' in selected_indicators and not pd.isna(row['RSI']):
-            if row['RSI'] > 70:
-                sell_signals += 1
-            elif row['RSI'] < 30:
-                buy_signals += 1
-            else:
-                hold_signals += 1
-
-        # SMA and EMA Logic
-        for ma_type in ['SMA', 'EMA']:
-            if f'{ma_type}_5' in selected_indicators and f'{ma_type}_10' in selected_indicators:
-                if row[f'{ma_type}_5'] > row[f'{ma_type}_10']:
-                    buy_signals += 1
-                elif row[f'{ma_type}_5'] < row[f'{ma_type}_10']:
-                    sell_signals += 1
-                else:
-                    hold_signals += 1
-
-            if f'{ma_type}_5' in selected_indicators and f'{ma_type}_20' in selected_indicators:
-                if row[f'{ma_type}_5'] > row[f'{ma_type}_20']:
-                    buy_signals += 1
-                elif row[f'{ma_type}_5'] < row[f'{ma_type}_20']:
-                    sell_signals += 1
-                else:
-                    hold_signals += 1
-
-        # MACD and Signal Line Logic
-        if 'MACD' in selected_indicators and 'Signal_Line' in selected_indicators:
-            if row['MACD'] > row['Signal_Line']:
-                buy_signals += 1
-            elif row['MACD'] < row['Signal_Line']:
-                sell_signals += 1
-            else:
-                hold_signals += 1
-
-    return {"buy": buy_signals, "sell": sell_signals, "hold": hold_signals}
-
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
 
 
 if __name__ == '__main__':
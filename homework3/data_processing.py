@@ -1,12 +1,121 @@
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+
 import pandas as pd
 
+from price_schema import memory_footprint, normalize_company_data
+
+# Број на редови по дел при читање на дел од компаниите од CSV фајлот
+CSV_CHUNK_ROWS = 200_000
+
+def load_snapshot(file_path, company_code=None, columns=None):
+    """
+    Вчитување од колонскиот Parquet снимок, партициониран по CompanyCode.
+    Се читаат само бараните колони и само партициите на бараните компании.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([('CompanyCode', pa.string())]), flavor='hive')
+    dataset = ds.dataset(file_path, format='parquet', partitioning=partitioning)
+    filter_expression = None
+    if company_code is not None:
+        codes = [company_code] if isinstance(company_code, str) else list(company_code)
+        filter_expression = ds.field('CompanyCode').isin(codes)
+    table = dataset.to_table(columns=columns, filter=filter_expression)
+    data = table.to_pandas()
+    if 'CompanyCode' in data.columns:
+        data['CompanyCode'] = data['CompanyCode'].astype(str)
+    return data
+
+def load_company_data(file_path, company_code=None, columns=None):
+    """
+    Вчитување на дневната историја од Parquet снимокот, SQLite базата (company_data.db)
+    или од CSV фајлот. company_code може да биде една шифра или листа шифри, а
+    columns ограничува кои колони се вчитуваат.
+    """
+    codes = None
+    if company_code is not None:
+        codes = [company_code] if isinstance(company_code, str) else list(company_code)
+
+    extension = os.path.splitext(file_path)[1]
+    if extension == '.parquet':
+        return load_snapshot(file_path, codes, columns)
+
+    if extension == '.db':
+        selected = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+        query = f"SELECT {selected} FROM company_data"
+        if codes is not None:
+            query += f" WHERE CompanyCode IN ({', '.join('?' for _ in codes)})"
+        with closing(sqlite3.connect(file_path)) as connection:
+            data = pd.read_sql_query(query + " ORDER BY CompanyCode, Date", connection, params=codes or [])
+        if 'Date' in data.columns:
+            data['Date'] = pd.to_datetime(data['Date'], format='%Y-%m-%d')
+        return data
+
+    if codes is None:
+        return pd.read_csv(file_path, usecols=columns, low_memory=False)
+    # CSV фајлот се чита во делови, така што во меморија остануваат само редовите на бараните компании
+    chunks = [chunk[chunk['CompanyCode'].isin(codes)]
+              for chunk in pd.read_csv(file_path, usecols=columns, low_memory=False, chunksize=CSV_CHUNK_ROWS)]
+    if not chunks:
+        return pd.read_csv(file_path, usecols=columns, nrows=0)
+    return pd.concat(chunks, ignore_index=True)
+
+def list_company_codes(file_path):
+    """
+    Листа на сите шифри на компании, без вчитување на историјата.
+    """
+    extension = os.path.splitext(file_path)[1]
+    if extension == '.parquet':
+        prefix = 'CompanyCode='
+        return sorted(name[len(prefix):] for name in os.listdir(file_path) if name.startswith(prefix))
+    if extension == '.db':
+        with closing(sqlite3.connect(file_path)) as connection:
+            rows = connection.execute("SELECT DISTINCT CompanyCode FROM company_data ORDER BY CompanyCode").fetchall()
+        return [row[0] for row in rows]
+    return sorted(pd.read_csv(file_path, usecols=['CompanyCode'])['CompanyCode'].dropna().unique().tolist())
+
+def dataset_version(file_path):
+    """
+    Верзија на податоците: се менува секогаш кога снимокот, базата или CSV фајлот
+    се препишани, без читање на нивната содржина.
+    """
+    paths = [file_path]
+    if os.path.isdir(file_path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(file_path) for name in names)
+    if os.path.splitext(file_path)[1] == '.db':
+        # Промените во WAL режим прво се запишуваат во -wal фајлот
+        paths.append(file_path + '-wal')
+    # Патеките се релативни на директориумот со податоци, за процеси што ги монтираат
+    # податоците на различни места да ја добијат истата верзија
+    root = os.path.dirname(os.path.abspath(file_path))
+    stats = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stats.append((os.path.relpath(os.path.abspath(path), root).replace(os.sep, '/'), stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr(stats).encode()).hexdigest()[:16]
+
+def find_data_path(data_dir="data"):
+    """
+    Патека до колонскиот снимок ако постои, потоа до базата, инаку до CSV фајлот.
+    """
+    for file_name in ("company_data.parquet", "company_data.db"):
+        path = os.path.join(data_dir, file_name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(data_dir, "company_data.csv")
+
 def load_data(file_path):
     """
     Читање на CSV фајлот и враќање на DataFrame.
     """
     try:
         print(f"Loading data from {file_path}...")
-        data = pd.read_csv(file_path)
+        data = load_company_data(file_path)
         print(f"Data loaded successfully with {len(data)} rows and {len(data.columns)} columns.")
         print("Columns:", data.columns.tolist())
         return data
@@ -16,12 +125,15 @@ def load_data(file_path):
 
 def preprocess_data(data):
     """
-    Претворање на колоната 'LastTradePrice' во нумерички тип и проверка за празни вредности.
+    Претворање на сите нумерички колони, датумите и шифрите на компаниите во компактниот
+    типизиран формат (price_schema) и проверка за празни вредности во 'LastTradePrice'.
     """
+    memory_before = memory_footprint(data)
+    data = normalize_company_data(data)
+    memory_after = memory_footprint(data)
+    print(f"Memory footprint: {memory_before / 2**20:.1f} MiB before, {memory_after / 2**20:.1f} MiB after normalization.")
+
     if 'LastTradePrice' in data.columns:
-        print("Processing 'LastTradePrice' column...")
-        # Претвори ја колоната во нумерички формат
-        data['LastTradePrice'] = pd.to_numeric(data['LastTradePrice'].str.replace(',', ''), errors='coerce')
         # Провери за празни вредности
         invalid_values = data['LastTradePrice'].isna().sum()
         print(f"Number of invalid values in 'LastTradePrice': {invalid_values}")
@@ -35,7 +147,7 @@ def group_by_company(data):
     """
     if 'CompanyCode' in data.columns:
         print("Grouping data by company...")
-        grouped_data = data.groupby('CompanyCode')
+        grouped_data = data.groupby('CompanyCode', observed=True)
         print(f"Data grouped into {len(grouped_data)} groups.")
         return grouped_data
     else:
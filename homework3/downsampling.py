@@ -0,0 +1,71 @@
+import numpy as np
+
+# Bounds for the requested chart width in pixels
+MIN_WIDTH = 100
+MAX_WIDTH = 4000
+DEFAULT_WIDTH = 1200
+
+
+def chart_width(value):
+    """
+    Pixel width requested by the client, clamped to a sane range.
+    """
+    try:
+        width = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_WIDTH
+    return min(max(width, MIN_WIDTH), MAX_WIDTH)
+
+
+def _buckets(values, bucket_size, fill):
+    padded = np.full(-(-len(values) // bucket_size) * bucket_size, fill)
+    padded[:len(values)] = np.where(np.isnan(values), fill, values)
+    return padded.reshape(-1, bucket_size)
+
+
+def minmax_positions(values, bucket_size):
+    """
+    Positions of the lowest and highest value in every bucket of bucket_size consecutive
+    points, so every peak and trough survives the downsampling.
+    """
+    offsets = np.arange(0, len(values), bucket_size)
+    lowest = _buckets(values, bucket_size, np.inf).argmin(axis=1)
+    highest = _buckets(values, bucket_size, -np.inf).argmax(axis=1)
+    return np.minimum(np.concatenate((offsets + lowest, offsets + highest)), len(values) - 1)
+
+
+def crossover_positions(fast, slow, bucket_size):
+    """
+    The two points around the first crossing of two lines in every bucket, so the chart
+    still shows the lines changing order.
+    """
+    with np.errstate(invalid='ignore'):
+        order = np.sign(fast - slow)
+    crossings = np.flatnonzero((order[1:] * order[:-1]) < 0) + 1
+    _, first = np.unique(crossings // bucket_size, return_index=True)
+    crossings = crossings[first]
+    return np.concatenate((crossings - 1, crossings))
+
+
+def downsample_positions(series, width, pairs=()):
+    """
+    Row positions to plot for each of several equally long series (a dict of name -> values)
+    on a chart width pixels wide: the first and last point, the minimum and maximum in each
+    one-pixel bucket and the points around the crossings with the other line of each given
+    (fast, slow) pair. The number of positions depends on the width, not on the length of
+    the history, and short series are returned whole. Returns a dict of name -> positions.
+    """
+    length = len(next(iter(series.values()))) if series else 0
+    if length <= 2 * width:
+        return {name: np.arange(length) for name in series}
+
+    bucket_size = -(-length // width)
+    values = {name: np.asarray(column, dtype='float64') for name, column in series.items()}
+    positions = {name: [np.array([0, length - 1]), minmax_positions(column, bucket_size)]
+                 for name, column in values.items()}
+    for fast, slow in pairs:
+        if fast in values and slow in values:
+            crossings = crossover_positions(values[fast], values[slow], bucket_size)
+            positions[fast].append(crossings)
+            positions[slow].append(crossings)
+    return {name: np.unique(np.concatenate(parts)) for name, parts in positions.items()}
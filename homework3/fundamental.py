@@ -1,88 +1,93 @@
 from flask import Flask, render_template, send_file
 import pandas as pd
 import os
-from textblob import TextBlob
+import re
+import sqlite3
+from contextlib import closing
+
+from data_processing import find_data_path, list_company_codes
+from issuer_matcher import IssuerMatcher
+from news_store import NewsStore
+from sentiment_cache import SentimentCache
 
 app = Flask(__name__)
 
 
-def load_company_codes():
-    try:
-        # Path to the company_data.csv file
-        csv_path = "data/company_data.csv"
-
-        # Load the CSV file
-        company_data = pd.read_csv(csv_path, low_memory=False)
-
-        # Check if 'Company Code' column exists
-        if 'CompanyCode' in company_data.columns:
-            # Remove duplicates and clean data
-            unique_company_codes = company_data['CompanyCode'].drop_duplicates().str.strip().str.lower().tolist()
-            print("Unique Company Codes:", unique_company_codes)  # Debugging: Print unique codes
-            return unique_company_codes
-        else:
-            print("Error: 'CompanyCode' column not found in the CSV file.")
-            return []
-    except FileNotFoundError:
-        print("Error: company_data.csv not found!")
-        return []
+# Optional file in the data directory with extra names for issuers, one "Alias,CompanyCode" pair per line
+ALIASES_FILE = "issuer_aliases.csv"
 
+# Legal-form suffix of listed company names, e.g. "Komercijalna banka AD Skopje"
+LEGAL_SUFFIX = re.compile(r'\s+(AD|A\.D\.|АД)(\s.*)?$', re.IGNORECASE)
 
-# Load company codes at startup
-company_codes = load_company_codes()
 
+# Load the (pattern, issuer, case_sensitive) triples the issuer matcher is built from: every
+# company code as written, the company names from the store with and without the legal-form
+# suffix, and the aliases file
+def load_issuer_patterns(data_dir="data"):
+    patterns = []
+    data_path = find_data_path(data_dir)
+    if os.path.exists(data_path):
+        patterns += [(code, code, True) for code in list_company_codes(data_path)]
 
-# Load news articles from CSV file
-def load_news():
-    try:
-        news_df = pd.read_csv("static/data/news_articles.csv")
-        return news_df
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["Title", "Link", "Published Date"])
+    db_path = os.path.join(data_dir, "company_data.db")
+    if os.path.exists(db_path):
+        with closing(sqlite3.connect(db_path)) as connection:
+            names = connection.execute("SELECT CompanyCode, Company FROM companies").fetchall()
+        for code, name in names:
+            if name and name != code:
+                patterns.append((name, code, False))
+                short_name = LEGAL_SUFFIX.sub('', name)
+                if short_name != name and len(short_name) >= 5:
+                    patterns.append((short_name, code, False))
 
+    aliases_path = os.path.join(data_dir, ALIASES_FILE)
+    if os.path.exists(aliases_path):
+        aliases = pd.read_csv(aliases_path)
+        patterns += [(alias, code, False) for alias, code in zip(aliases['Alias'], aliases['CompanyCode'])]
+    return patterns
 
-# Perform sentiment analysis on a single article
-def analyze_sentiment(text):
-    if not isinstance(text, str) or text.strip() == "":
-        return "neutral", 0.0
 
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
+# Build the issuer matcher once at startup
+issuer_matcher = IssuerMatcher(load_issuer_patterns())
 
-    if polarity > 0:
-        return "positive", polarity
-    elif polarity < 0:
-        return "negative", polarity
-    else:
-        return "neutral", polarity
+# Scraped news articles and their sentiment scores, keyed by content hash
+NEWS_DB_PATH = "data/news.db"
+sentiment_cache = SentimentCache(NEWS_DB_PATH)
 
 
-# Identify companies in the article (basic keyword matching for simplicity)
-def identify_company(text):
-    text = text.lower()
-    for company in company_codes:
-        if company in text:
-            print(f"Matched '{company}' in title: {text}")  # Debugging: Log successful matches
-            return company.upper()
-    print(f"No match found for title: {text}")  # Debugging: Log unmatched titles
-    return "Unknown"
+# Load news articles from the news store the scraper fills, or from the CSV file before it exists
+def load_news():
+    if os.path.exists(NEWS_DB_PATH):
+        news_df = NewsStore(NEWS_DB_PATH).read_frame()
+        if not news_df.empty:
+            return news_df
+    try:
+        news_df = pd.read_csv("static/data/news_articles.csv")
+        return news_df
+    except FileNotFoundError:
+        return pd.DataFrame(columns=["Title", "Link", "Published Date"])
 
 
+# Identify every company mentioned in the article
+def identify_companies(text):
+    return issuer_matcher.issuers(text)
 
 
-# Perform fundamental analysis on news data
+# Perform fundamental analysis on news data. Sentiment comes from the persistent cache the news
+# scraper fills; only titles it has not scored yet are scored here.
 def perform_fundamental_analysis(news_df):
+    titles = news_df["Title"].fillna("").tolist() if "Title" in news_df.columns else []
+    sentiment_cache.score_missing(titles, workers=1)
     results = []
-    for _, row in news_df.iterrows():
-        title = row.get("Title", "")
-        sentiment, polarity = analyze_sentiment(title)
-        company = identify_company(title)
+    for title, (sentiment, polarity) in zip(titles, sentiment_cache.lookup(titles)):
+        companies = identify_companies(title)
         recommendation = (
             "Buy" if sentiment == "positive" else ("Sell" if sentiment == "negative" else "Hold")
         )
 
         results.append({
-            "Company": company,
+            "Company": ", ".join(companies) or "Unknown",
+            "Companies": companies,
             "Title": title,
             "Sentiment": sentiment,
             "Polarity": round(polarity, 2),
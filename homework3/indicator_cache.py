@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from company_index import CompanyIndex
+from streaming_indicators import IndicatorState
+
+MANIFEST_NAME = "indicator_cache.json"
+
+
+def series_hashes(company_df):
+    """
+    One hash per row of the inputs the indicators depend on (Date and LastTradePrice).
+    Dates are hashed at nanosecond resolution and prices as float64, so the hashes do not
+    depend on which file format the rows were loaded from.
+    """
+    inputs = pd.DataFrame({
+        'Date': company_df['Date'].astype('datetime64[ns]').to_numpy(),
+        'LastTradePrice': company_df['LastTradePrice'].astype('float64').to_numpy(),
+    })
+    return pd.util.hash_pandas_object(inputs, index=False).to_numpy()
+
+
+def data_version(hashes):
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+class IndicatorCache:
+    """
+    Persisted per-company indicators in <cache_dir>/<CODE>_indicators.csv.
+
+    The manifest records for every company the data version (a hash of its date-sorted
+    source rows) the file was built from, the number of rows, the watermark date and the
+    streaming indicator state after the last row. A refresh skips companies whose version
+    is unchanged, appends only the new tail when the old rows are untouched, and rebuilds
+    the file otherwise.
+    """
+
+    def __init__(self, cache_dir="data"):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        self.frames = {}
+
+    def output_path(self, company_code):
+        return os.path.join(self.cache_dir, f"{company_code}_indicators.csv")
+
+    def save(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def _entry(self, company_df, hashes, state):
+        return {
+            'version': data_version(hashes),
+            'rows': len(company_df),
+            'columns': company_df.columns.tolist(),
+            'watermark': company_df['Date'].iloc[-1].strftime('%Y-%m-%d') if len(company_df) else None,
+            'state': state.to_dict(),
+        }
+
+    def _try_update(self, company_code, company_df, hashes):
+        """
+        Skip or extend the cached indicators of one company when its cached rows are still
+        valid. Returns 'unchanged', 'extended', or None when the file has to be rebuilt.
+        """
+        path = self.output_path(company_code)
+        entry = self.manifest.get(company_code)
+        cached = entry is not None and os.path.exists(path) and entry['columns'] == company_df.columns.tolist()
+
+        if cached and entry['version'] == data_version(hashes):
+            return 'unchanged'
+
+        if cached and entry['rows'] <= len(company_df) and data_version(hashes[:entry['rows']]) == entry['version']:
+            # Old rows are untouched, only the new tail needs indicators
+            state = IndicatorState.from_dict(entry['state'])
+            tail = company_df.iloc[entry['rows']:].reset_index(drop=True)
+            indicators = state.extend(tail['LastTradePrice'].astype('float64'))
+            pd.concat([tail, indicators], axis=1).to_csv(path, mode='a', header=False, index=False)
+            self.manifest[company_code] = self._entry(company_df, hashes, state)
+            return 'extended'
+        return None
+
+    def _write(self, company_code, frame, columns, hashes, state):
+        path = self.output_path(company_code)
+        temp_path = path + ".tmp"
+        frame.to_csv(temp_path, index=False)
+        os.replace(temp_path, path)
+        self.manifest[company_code] = self._entry(frame[columns], hashes, state)
+
+    def refresh(self, company_code, company_df):
+        """
+        Bring the cached indicators of one company up to date with its rows.
+        Returns 'unchanged', 'extended' or 'rebuilt'.
+        """
+        company_df = company_df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+        hashes = series_hashes(company_df)
+        outcome = self._try_update(company_code, company_df, hashes)
+        if outcome is not None:
+            return outcome
+
+        state = IndicatorState()
+        indicators = state.extend(company_df['LastTradePrice'].astype('float64'))
+        self._write(company_code, pd.concat([company_df, indicators], axis=1),
+                    company_df.columns.tolist(), hashes, state)
+        return 'rebuilt'
+
+    def refresh_all(self, data, compute_batch):
+        """
+        Bring the cached indicators of every company in data up to date. Companies that need
+        a rebuild are computed together with compute_batch(rows), which returns the rows with
+        their indicator columns sorted by (CompanyCode, Date) and the streaming state of each
+        company. Returns {company_code: outcome}.
+        """
+        index = CompanyIndex(data)
+        columns = index.data.columns.tolist()
+        outcomes = {}
+        rebuild = {}
+        for company_code in index.companies():
+            company_df = index.get(company_code).reset_index(drop=True)
+            hashes = series_hashes(company_df)
+            outcomes[company_code] = self._try_update(company_code, company_df, hashes)
+            if outcomes[company_code] is None:
+                rebuild[company_code] = hashes
+
+        if rebuild:
+            rows = pd.concat([index.get(company_code) for company_code in rebuild])
+            batch, states = compute_batch(rows)
+            batch_index = CompanyIndex(batch)
+            for company_code, hashes in rebuild.items():
+                frame = batch_index.get(company_code).reset_index(drop=True)
+                self._write(company_code, frame, columns, hashes, states[company_code])
+                outcomes[company_code] = 'rebuilt'
+        return outcomes
+
+    def get(self, company_code, company_df, compute):
+        """
+        Indicators for the date-sorted rows of one company: read from the cache file when
+        it was built from exactly these rows, otherwise computed with compute(company_df).
+        The last frame per company is kept in memory.
+        """
+        version = data_version(series_hashes(company_df))
+        loaded = self.frames.get(company_code)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        entry = self.manifest.get(company_code)
+        path = self.output_path(company_code)
+        if entry is not None and entry['version'] == version and os.path.exists(path):
+            frame = pd.read_csv(path, parse_dates=['Date'])
+        else:
+            frame = compute(company_df).reset_index(drop=True)
+        self.frames[company_code] = (version, frame)
+        return frame
@@ -0,0 +1,99 @@
+from collections import deque
+
+
+class IssuerMatcher:
+    """
+    Aho-Corasick automaton over issuer codes, names and aliases.
+
+    All patterns are matched in a single pass over a text, however many issuers there
+    are. A match only counts on word boundaries, so a short code never matches inside a
+    longer word, and patterns added with case_sensitive=True (the ticker codes) must also
+    match the case of the text exactly; all other patterns ignore case.
+    """
+
+    def __init__(self, patterns):
+        # patterns: iterable of (pattern, issuer, case_sensitive)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.patterns = []
+        for pattern, issuer, case_sensitive in patterns:
+            pattern = pattern.strip()
+            if pattern:
+                self._add(pattern, issuer, case_sensitive)
+        self._link()
+
+    def _add(self, pattern, issuer, case_sensitive):
+        state = 0
+        for char in _lower(pattern):
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append(len(self.patterns))
+        self.patterns.append((pattern, issuer, case_sensitive))
+
+    def _link(self):
+        # Breadth-first, so the failure state of every node is final before its children are linked
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """
+        Every match in text as (start, end, issuer), in order of the end position.
+        """
+        matches = []
+        state = 0
+        for position, char in enumerate(_lower(text)):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for index in self.output[state]:
+                pattern, issuer, case_sensitive = self.patterns[index]
+                start, end = position + 1 - len(pattern), position + 1
+                if not _is_word_boundary(text, start, end):
+                    continue
+                if case_sensitive and text[start:end] != pattern:
+                    continue
+                matches.append((start, end, issuer))
+        return matches
+
+    def issuers(self, text):
+        """
+        All issuers mentioned in text, each once, in order of their first mention. A match
+        inside a longer match (e.g. a name that is part of another issuer's name) is ignored.
+        """
+        if not isinstance(text, str):
+            return []
+        # Longest first at each start, so a contained match always comes after its container
+        matches = sorted(self.find(text), key=lambda match: (match[0], -match[1]))
+        issuers = []
+        covered_until = 0
+        for start, end, issuer in matches:
+            if end <= covered_until:
+                continue
+            covered_until = end
+            issuers.append(issuer)
+        return list(dict.fromkeys(issuers))
+
+
+def _lower(text):
+    # Lowercase without changing the length, so positions in the lowered text are valid in the original
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(char.lower()[0] for char in text)
+
+
+def _is_word_boundary(text, start, end):
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
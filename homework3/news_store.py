@@ -0,0 +1,61 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    Link TEXT PRIMARY KEY,
+    Title TEXT NOT NULL,
+    PublishedDate TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS news_published ON news (PublishedDate);
+"""
+
+
+class NewsStore:
+    """
+    Scraped news articles in SQLite, one row per article link. Links are the primary key,
+    so checking whether an article is already stored is an index lookup and re-inserting
+    one is a no-op.
+    """
+
+    def __init__(self, path="data/news.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(sqlite3.connect(path)) as connection:
+            connection.executescript(SCHEMA)
+
+    def known_links(self, links):
+        links = list(links)
+        if not links:
+            return set()
+        with closing(sqlite3.connect(self.path)) as connection:
+            rows = connection.execute(
+                f"SELECT Link FROM news WHERE Link IN ({', '.join('?' for _ in links)})", links).fetchall()
+        return {row[0] for row in rows}
+
+    def insert(self, articles):
+        """
+        Store new articles (dicts with Title, Link and Published Date) and return how many
+        were not stored before.
+        """
+        rows = [(article["Link"], article["Title"], article["Published Date"]) for article in articles]
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO news (Link, Title, PublishedDate) VALUES (?, ?, ?)", rows)
+            return connection.total_changes - before
+
+    def read_frame(self):
+        """
+        All stored articles, newest first, with the columns of news_articles.csv.
+        """
+        with closing(sqlite3.connect(self.path)) as connection:
+            return pd.read_sql_query(
+                'SELECT Title, Link, PublishedDate AS "Published Date" FROM news '
+                'ORDER BY PublishedDate DESC, Link', connection)
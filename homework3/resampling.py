@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from company_index import CompanyIndex
+
+# Period frequency of each bar timeframe; weeks end on Sunday
+TIMEFRAMES = {'weekly': 'W', 'monthly': 'M'}
+
+SUM_COLUMNS = ['Volume', 'TurnoverBESTMKD', 'TurnoverTotalMKD']
+BAR_COLUMNS = ['CompanyCode', 'Date', 'Open', 'High', 'Low', 'Close'] + SUM_COLUMNS + ['Days']
+
+
+def resample_ohlcv(data, timeframe):
+    """
+    OHLCV bars per company from daily rows: open and close are the first and last
+    LastTradePrice of the period, high and low the extremes of Max and Min (or of the
+    price on days without them), and volume and turnover are summed. Date is the last
+    trading day of the period and Days the number of daily rows in the bar.
+    """
+    price = data['LastTradePrice'].astype('float64')
+    high = np.fmax(data['Max'].astype('float64'), price) if 'Max' in data.columns else price
+    low = np.fmin(data['Min'].astype('float64'), price) if 'Min' in data.columns else price
+    frame = pd.DataFrame({
+        'CompanyCode': data['CompanyCode'],
+        'Period': data['Date'].dt.to_period(TIMEFRAMES[timeframe]),
+        'Date': data['Date'],
+        'Open': price,
+        'High': high,
+        'Low': low,
+        'Close': price,
+    })
+    for column in SUM_COLUMNS:
+        frame[column] = data[column] if column in data.columns else 0
+    frame = frame.sort_values(['CompanyCode', 'Date'], kind='mergesort')
+
+    bars = frame.groupby(['CompanyCode', 'Period'], observed=True, sort=True).agg(
+        Date=('Date', 'last'), Open=('Open', 'first'), High=('High', 'max'), Low=('Low', 'min'),
+        Close=('Close', 'last'), Volume=('Volume', 'sum'), TurnoverBESTMKD=('TurnoverBESTMKD', 'sum'),
+        TurnoverTotalMKD=('TurnoverTotalMKD', 'sum'), Days=('Date', 'size'))
+    return bars.reset_index()[BAR_COLUMNS]
+
+
+def refresh_bars(bar_index, index, timeframe):
+    """
+    Bring bars built earlier by resample_ohlcv (behind bar_index) up to date with the daily
+    rows behind index. Only the rows from the start of each company's last bar onwards are
+    aggregated again, since that bar may have been partial; earlier bars are kept as they
+    are. A company whose number of rows before that point changed (a backfill or deleted
+    rows) is rebuilt from all its rows.
+    """
+    freq = TIMEFRAMES[timeframe]
+    bar_days = bar_index.data['Days'].to_numpy()
+    kept, recompute = [], []
+    for company_code, (start, stop) in index.bounds.items():
+        if company_code in bar_index:
+            bar_start, bar_stop = bar_index.bounds[company_code]
+            cut = pd.Timestamp(bar_index.dates[bar_stop - 1]).to_period(freq).start_time
+            split = int(np.searchsorted(index.dates[start:stop], np.datetime64(cut), side='left'))
+            if bar_days[bar_start:bar_stop - 1].sum() == split:
+                kept.append(np.arange(bar_start, bar_stop - 1))
+                recompute.append(np.arange(start + split, stop))
+                continue
+        recompute.append(np.arange(start, stop))
+
+    empty = np.array([], dtype='int64')
+    refreshed = pd.concat([bar_index.data.iloc[np.concatenate(kept + [empty])],
+                           resample_ohlcv(index.data.iloc[np.concatenate(recompute + [empty])], timeframe)],
+                          ignore_index=True)
+    refreshed['CompanyCode'] = refreshed['CompanyCode'].astype(str).astype('category')
+    return refreshed
+
+
+def build_bars(index, previous=None):
+    """
+    Weekly and monthly bars of every company in the daily rows behind index, each behind
+    its own CompanyIndex. When the bars of the previous data version are given they are
+    refreshed incrementally.
+    """
+    bars = {}
+    for timeframe in TIMEFRAMES:
+        if previous is not None and timeframe in previous:
+            frame = refresh_bars(previous[timeframe], index, timeframe)
+        else:
+            frame = resample_ohlcv(index.data, timeframe)
+        bars[timeframe] = CompanyIndex(frame)
+    return bars
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Bounded least-recently-used cache of serialized responses.
+
+    Keys include the version of the dataset the response was built from, and setting a
+    new version drops every entry, so a data reload never serves stale results. Hit,
+    miss and eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def set_version(self, version):
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.entries.clear()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries), 'max_entries': self.max_entries,
+                    'version': self.version, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
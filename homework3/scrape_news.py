@@ -1,25 +1,64 @@
-import pandas as pd
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
+import os
+
+from news_store import NewsStore
+from sentiment_cache import SentimentCache
 
 # Set up logging for debugging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-# Scrape a single page of news
-def scrape_page(page, one_month_ago):
-    base_url = "https://www.mse.mk/en/news/latest"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    url = f"{base_url}?page={page}"
-    response = requests.get(url, headers=headers)
+# Site to scrape, overridable so a run can be pointed at homework1/mse_simulator.py
+SITE_URL = os.environ.get("MSE_BASE_URL", "https://www.mse.mk").rstrip("/")
+NEWS_URL = f"{SITE_URL}/en/news/latest"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Largest number of pages fetched at the same time; waves start at one page and double up to this
+MAX_CONCURRENCY = 8
+REQUEST_TIMEOUT = 30
+
+# Failed requests are retried with exponential backoff before a run gives up
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# Only articles published within this many days are kept
+CUTOFF_DAYS = 365
+
 
+# Pooled keep-alive session shared by all page fetches, retrying failed requests
+def make_session():
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retries = Retry(total=MAX_RETRIES, backoff_factor=BACKOFF_SECONDS, status_forcelist=RETRY_STATUSES,
+                    allowed_methods=["GET"])
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY, max_retries=retries))
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY, max_retries=retries))
+    return session
+
+
+# Fetch a single page of news, None when it could not be retrieved even after retrying
+def fetch_page(session, page):
+    try:
+        response = session.get(f"{NEWS_URL}?page={page}", timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        logging.warning(f"Failed to retrieve page {page}: {e}")
+        return None
     if response.status_code != 200:
         logging.warning(f"Failed to retrieve page {page}. Status code: {response.status_code}")
-        return []
+        return None
+    return response.text
+
 
-    soup = BeautifulSoup(response.text, "html.parser")
+# Parse the articles of a single page, in page order (newest first)
+def parse_page(content, page):
+    soup = BeautifulSoup(content, "html.parser")
 
     # Find all rows containing news items
     rows = soup.find_all("div", class_="row")
@@ -41,22 +80,15 @@ def scrape_page(page, one_month_ago):
             except ValueError:
                 continue
 
-            # Skip articles older than one month
-            if published_date < one_month_ago:
-                continue
-
             # Extract title and link from the second column (col-md-11)
             title_element = row.find("div", class_="col-md-11").find("a")
             if not title_element or not title_element.text.strip():
                 logging.warning(f"Missing or empty title on page {page}. Skipping item.")
                 continue
 
-            title = title_element.text.strip()
-            link = "https://www.mse.mk" + title_element["href"]  # Add base URL to relative link
-
             news_data.append({
-                "Title": title,
-                "Link": link,
+                "Title": title_element.text.strip(),
+                "Link": SITE_URL + title_element["href"],  # Add base URL to relative link
                 "Published Date": published_date.strftime("%Y-%m-%d")
             })
         except Exception as e:
@@ -65,38 +97,63 @@ def scrape_page(page, one_month_ago):
     return news_data
 
 
-# Scrape multiple pages of news
-def scrape_news(max_pages=10):
-    current_date = datetime.now()
-    one_month_ago = current_date - timedelta(days=365)  # Calculate the cutoff date for one month ago
-
-    all_news_data = []
-    for page in range(1, max_pages + 1):
-        logging.info(f"Scraping page {page}...")
-        page_data = scrape_page(page, one_month_ago)
-        all_news_data.extend(page_data)
-
-    return all_news_data
-
-
-# Main function to scrape and save news
+# Scrape the news newer than the cutoff that are not in the store yet. Pages are fetched in
+# concurrent waves of 1, 2, 4, ... pages and read in page order; paging stops at the first
+# article that is already stored or older than the cutoff, or at an empty page. A routine refresh
+# therefore costs one or two page fetches. When a page cannot be fetched, None is returned and
+# nothing should be stored: storing the newer articles alone would make the next run stop at them
+# and never reach the older ones behind the failed page.
+def scrape_news(store, max_pages=100, cutoff_days=CUTOFF_DAYS):
+    cutoff = (datetime.now() - timedelta(days=cutoff_days)).strftime("%Y-%m-%d")
+    session = make_session()
+    new_articles = []
+    page, wave = 1, 1
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        while page <= max_pages:
+            pages = list(range(page, min(page + wave, max_pages + 1)))
+            logging.info(f"Scraping pages {pages[0]}-{pages[-1]}...")
+            contents = list(executor.map(lambda number: fetch_page(session, number), pages))
+
+            for number, content in zip(pages, contents):
+                if content is None:
+                    logging.error(f"Page {number} could not be retrieved; stopping without storing this run.")
+                    return None
+                articles = parse_page(content, number)
+                if not articles:
+                    return new_articles
+                known = store.known_links(article["Link"] for article in articles)
+                for article in articles:
+                    if article["Link"] in known or article["Published Date"] < cutoff:
+                        logging.info(f"Reached stored or old news on page {number}.")
+                        return new_articles
+                    new_articles.append(article)
+
+            page += len(pages)
+            wave = min(wave * 2, MAX_CONCURRENCY)
+    return new_articles
+
+
+# Main function to scrape the new articles, store them and refresh the CSV export
 def scrape_and_save_news():
-    all_news_data = scrape_news()
+    store = NewsStore()
+    new_articles = scrape_news(store)
 
-    if not all_news_data:
-        logging.info("No recent news data scraped.")
+    if new_articles is None:
+        return
+    if not new_articles:
+        logging.info("No new news articles.")
         return
 
-    # Remove duplicates from the data based on Title and Link
-    news_df = pd.DataFrame(all_news_data)
-
-    # Deduplicate based on Title and Link to ensure no overwriting occurs
-    news_df.drop_duplicates(subset=["Title", "Link"], inplace=True)
+    inserted = store.insert(new_articles)
+    logging.info(f"{inserted} new articles stored in {store.path}.")
 
-    # Save all unique entries into the CSV file
+    # Keep news_articles.csv as an export of the whole store
+    news_df = store.read_frame()
     news_df.to_csv("static/data/news_articles.csv", index=False)
 
-    logging.info("Filtered and deduplicated news data saved to news_articles.csv.")
+    # Score the sentiment of new titles now, in a worker pool, so the analysis page only looks them up
+    scored = SentimentCache().score_missing([article["Title"] for article in new_articles])
+    logging.info(f"Sentiment scored for {scored} new articles.")
 
 
 if __name__ == "__main__":
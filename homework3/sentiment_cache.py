@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+# Batches smaller than this are scored in the calling process; starting workers costs more
+MIN_POOL_BATCH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment (
+    Hash TEXT PRIMARY KEY,
+    Sentiment TEXT NOT NULL,
+    Polarity REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def content_hash(text):
+    """
+    Key of an article's score: a hash of its stripped text, so the same title scraped
+    again (or from another page) is never scored twice.
+    """
+    text = text.strip() if isinstance(text, str) else ""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def analyze_sentiment(text):
+    """
+    Sentiment label and TextBlob polarity of one text.
+    """
+    from textblob import TextBlob
+
+    if not isinstance(text, str) or text.strip() == "":
+        return "neutral", 0.0
+
+    polarity = TextBlob(text).sentiment.polarity
+    if polarity > 0:
+        return "positive", polarity
+    elif polarity < 0:
+        return "negative", polarity
+    else:
+        return "neutral", polarity
+
+
+class SentimentCache:
+    """
+    Persistent sentiment scores in SQLite, keyed by content hash.
+
+    Scores are held in memory after the first read and reloaded when the database file
+    changes, so looking up the scores of the articles is a dictionary access each.
+    """
+
+    def __init__(self, path="data/news.db"):
+        self.path = path
+        self.scores = {}
+        self.loaded_version = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(sqlite3.connect(path)) as connection:
+            connection.executescript(SCHEMA)
+
+    def _version(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        version = self._version()
+        if version != self.loaded_version:
+            with closing(sqlite3.connect(self.path)) as connection:
+                rows = connection.execute("SELECT Hash, Sentiment, Polarity FROM sentiment").fetchall()
+            self.scores = {key: (sentiment, polarity) for key, sentiment, polarity in rows}
+            self.loaded_version = version
+
+    def lookup(self, texts):
+        """
+        (sentiment, polarity) of each text, or None for texts that were never scored.
+        """
+        self._reload()
+        return [self.scores.get(content_hash(text)) for text in texts]
+
+    def score_missing(self, texts, workers=None):
+        """
+        Score the texts that are not cached yet, in a process pool for large batches, and
+        store the scores. Returns the number of newly scored texts.
+        """
+        self._reload()
+        missing = {}
+        for text in texts:
+            key = content_hash(text)
+            if key not in self.scores:
+                missing[key] = text
+        if not missing:
+            return 0
+
+        if len(missing) < MIN_POOL_BATCH or workers == 1:
+            scores = [analyze_sentiment(text) for text in missing.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_size = max(1, len(missing) // (4 * (workers or os.cpu_count() or 1)))
+                scores = list(executor.map(analyze_sentiment, missing.values(), chunksize=chunk_size))
+
+        rows = [(key, sentiment, polarity) for key, (sentiment, polarity) in zip(missing, scores)]
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO sentiment (Hash, Sentiment, Polarity) VALUES (?, ?, ?)", rows)
+        self.scores.update({key: (sentiment, polarity) for key, sentiment, polarity in rows})
+        self.loaded_version = self._version()
+        return len(rows)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Moving-average pairs compared by the crossover rule: the fast average against each slower one
+MA_PAIRS = [(5, 10), (5, 20)]
+
+
+def _column(indicators_df, name):
+    return indicators_df[name].to_numpy(dtype='float64')
+
+
+def rsi_rule(indicators_df):
+    """
+    RSI above 70 is a sell, below 30 a buy, anything else a hold; days without an RSI are skipped.
+    """
+    rsi = _column(indicators_df, 'RSI')
+    buy = rsi < 30
+    sell = rsi > 70
+    hold = ~np.isnan(rsi) & ~buy & ~sell
+    return buy, sell, hold
+
+
+def crossover_rule(indicators_df, fast, slow):
+    """
+    Fast line above the slow one is a buy, below it a sell, otherwise (equal or missing) a hold.
+    """
+    fast_values = _column(indicators_df, fast)
+    slow_values = _column(indicators_df, slow)
+    buy = fast_values > slow_values
+    sell = fast_values < slow_values
+    hold = ~buy & ~sell
+    return buy, sell, hold
+
+
+def crossover_pairs(selected_indicators):
+    """
+    The (fast, slow) line pairs the crossover rules compare among the selected indicators.
+    """
+    selected = set(selected_indicators)
+    pairs = [(f'{ma_type}_{fast}', f'{ma_type}_{slow}') for ma_type in ['SMA', 'EMA'] for fast, slow in MA_PAIRS]
+    pairs.append(('MACD', 'Signal_Line'))
+    return [(fast, slow) for fast, slow in pairs if fast in selected and slow in selected]
+
+
+def selected_rules(selected_indicators):
+    """
+    The rules that apply to the selected indicators, as (name, function) pairs.
+    """
+    rules = []
+    if 'RSI' in selected_indicators:
+        rules.append(('RSI', rsi_rule))
+    for fast, slow in crossover_pairs(selected_indicators):
+        rules.append((f'{fast}/{slow}', lambda df, a=fast, b=slow: crossover_rule(df, a, b)))
+    return rules
+
+
+def signal_series(indicators_df, selected_indicators):
+    """
+    Number of buy, sell and hold signals on each date, as a frame indexed like indicators_df.
+    """
+    rows = len(indicators_df)
+    counts = {'buy': np.zeros(rows, dtype='int64'),
+              'sell': np.zeros(rows, dtype='int64'),
+              'hold': np.zeros(rows, dtype='int64')}
+    for _, rule in selected_rules(selected_indicators):
+        buy, sell, hold = rule(indicators_df)
+        counts['buy'] += buy
+        counts['sell'] += sell
+        counts['hold'] += hold
+    return pd.DataFrame(counts, index=indicators_df.index)
+
+
+def summarize_signals(daily_signals):
+    totals = daily_signals.sum()
+    return {"buy": int(totals['buy']), "sell": int(totals['sell']), "hold": int(totals['hold'])}
+
+
+def calculate_signals(indicators_df, selected_indicators):
+    """
+    Calculate buy, sell, and hold signals based on indicators.
+    """
+    return summarize_signals(signal_series(indicators_df, selected_indicators))
@@ -0,0 +1,248 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _to_json_number(value):
+    return None if value is None or math.isnan(value) else value
+
+
+def _from_json_number(value):
+    return NAN if value is None else value
+
+
+class SMAState:
+    """
+    Simple moving average over the last `window` prices, the same as
+    Series.rolling(window).mean(): the value is NaN until the window is full and
+    while any price in it is missing.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.missing = 0
+        self.value = NAN
+
+    def update(self, price):
+        self.values.append(price)
+        if math.isnan(price):
+            self.missing += 1
+        else:
+            self.total += price
+        if len(self.values) > self.window:
+            dropped = self.values.popleft()
+            if math.isnan(dropped):
+                self.missing -= 1
+            else:
+                self.total -= dropped
+        if len(self.values) == self.window and self.missing == 0:
+            self.value = self.total / self.window
+        else:
+            self.value = NAN
+        return self.value
+
+    def to_dict(self):
+        return {'window': self.window, 'values': [_to_json_number(v) for v in self.values]}
+
+    @classmethod
+    def from_dict(cls, state):
+        sma = cls(state['window'])
+        for value in state['values']:
+            sma.update(_from_json_number(value))
+        return sma
+
+
+class EMAState:
+    """
+    Exponential moving average, the same as Series.ewm(span=span, adjust=False).mean(),
+    including how pandas carries the average over missing prices.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = NAN
+        self.old_weight = 1.0
+
+    def update(self, price):
+        is_observation = not math.isnan(price)
+        if not math.isnan(self.value):
+            self.old_weight *= 1.0 - self.alpha
+            if is_observation:
+                if self.value != price:
+                    self.value = (self.old_weight * self.value + self.alpha * price) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif is_observation:
+            self.value = price
+        return self.value
+
+    def to_dict(self):
+        return {'span': self.span, 'value': _to_json_number(self.value), 'old_weight': self.old_weight}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state['span'])
+        ema.value = _from_json_number(state['value'])
+        ema.old_weight = state['old_weight']
+        return ema
+
+
+class RSIState:
+    """
+    RSI with simple moving averages of gains and losses over `period` price changes,
+    the same as calculate_rsi.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = NAN
+        self.gains = SMAState(period)
+        self.losses = SMAState(period)
+        self.value = NAN
+
+    def update(self, price):
+        delta = price - self.previous
+        self.previous = price
+        # Like delta.where(delta > 0, 0), a missing change counts as neither gain nor loss
+        average_gain = self.gains.update(delta if delta > 0 else 0.0)
+        average_loss = self.losses.update(-delta if delta < 0 else 0.0)
+        if math.isnan(average_gain) or (average_gain == 0 and average_loss == 0):
+            self.value = NAN
+        elif average_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - (100 / (1 + average_gain / average_loss))
+        return self.value
+
+    def to_dict(self):
+        return {'period': self.period, 'previous': _to_json_number(self.previous),
+                'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        rsi = cls(state['period'])
+        rsi.previous = _from_json_number(state['previous'])
+        rsi.gains = SMAState.from_dict(state['gains'])
+        rsi.losses = SMAState.from_dict(state['losses'])
+        return rsi
+
+
+class MACDState:
+    """
+    MACD line and signal line, the same as calculate_macd.
+    """
+
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_ema = EMAState(short_window)
+        self.long_ema = EMAState(long_window)
+        self.signal_ema = EMAState(signal_window)
+        self.macd = NAN
+        self.signal_line = NAN
+
+    def update(self, price):
+        self.macd = self.short_ema.update(price) - self.long_ema.update(price)
+        self.signal_line = self.signal_ema.update(self.macd)
+        return self.macd, self.signal_line
+
+    def to_dict(self):
+        return {'short_ema': self.short_ema.to_dict(), 'long_ema': self.long_ema.to_dict(),
+                'signal_ema': self.signal_ema.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        macd = cls()
+        macd.short_ema = EMAState.from_dict(state['short_ema'])
+        macd.long_ema = EMAState.from_dict(state['long_ema'])
+        macd.signal_ema = EMAState.from_dict(state['signal_ema'])
+        return macd
+
+
+class IndicatorState:
+    """
+    The full indicator set of calculate_indicators (RSI, SMA/EMA 5, 10 and 20, MACD and
+    Signal_Line) as incremental state. Each new price advances every indicator in constant
+    time, and the state can be saved with to_dict and restored with from_dict, so new days
+    extend the indicators without recomputing the history.
+    """
+
+    COLUMNS = ['RSI', 'SMA_5', 'EMA_5', 'SMA_10', 'EMA_10', 'SMA_20', 'EMA_20', 'MACD', 'Signal_Line']
+
+    def __init__(self, windows=(5, 10, 20)):
+        self.rsi = RSIState()
+        self.sma = {window: SMAState(window) for window in windows}
+        self.ema = {window: EMAState(window) for window in windows}
+        self.macd = MACDState()
+
+    def update(self, price):
+        price = float(price)
+        values = {'RSI': self.rsi.update(price)}
+        for window in self.sma:
+            values[f'SMA_{window}'] = self.sma[window].update(price)
+            values[f'EMA_{window}'] = self.ema[window].update(price)
+        values['MACD'], values['Signal_Line'] = self.macd.update(price)
+        return values
+
+    def extend(self, prices):
+        """
+        Advance over a sequence of prices and return the indicator rows as a DataFrame.
+        """
+        rows = [self.update(price) for price in prices]
+        return pd.DataFrame(rows, columns=self.COLUMNS, dtype='float64')
+
+    @classmethod
+    def from_history(cls, prices, ema_values, signal_value, windows=(5, 10, 20)):
+        """
+        Rebuild the state after a whole price history from the results of a batch pass,
+        without replaying it: ema_values maps each EMA span (the windows, 12 and 26) to its
+        last value and signal_value is the last Signal_Line value.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        observed = np.flatnonzero(~np.isnan(prices))
+        trailing_missing = len(prices) - 1 - observed[-1] if len(observed) else 0
+
+        def ema_state(span, value, missing):
+            ema = EMAState(span)
+            ema.value = float(value)
+            if not math.isnan(ema.value):
+                ema.old_weight = (1.0 - ema.alpha) ** missing
+            return ema
+
+        indicators = cls(windows=())
+        for window in windows:
+            indicators.sma[window] = SMAState.from_dict({'window': window, 'values': prices[-window:].tolist()})
+            indicators.ema[window] = ema_state(window, ema_values[window], trailing_missing)
+
+        period = indicators.rsi.period
+        deltas = np.diff(prices[-(period + 1):], prepend=np.nan if len(prices) <= period else [])
+        for delta in deltas:
+            indicators.rsi.gains.update(delta if delta > 0 else 0.0)
+            indicators.rsi.losses.update(-delta if delta < 0 else 0.0)
+        indicators.rsi.previous = float(prices[-1]) if len(prices) else NAN
+
+        macd = indicators.macd
+        macd.short_ema = ema_state(macd.short_ema.span, ema_values[macd.short_ema.span], trailing_missing)
+        macd.long_ema = ema_state(macd.long_ema.span, ema_values[macd.long_ema.span], trailing_missing)
+        # MACD is only missing before the first price, so the signal line has no trailing gaps
+        macd.signal_ema = ema_state(macd.signal_ema.span, signal_value, 0)
+        return indicators
+
+    def to_dict(self):
+        return {'rsi': self.rsi.to_dict(),
+                'sma': [state.to_dict() for state in self.sma.values()],
+                'ema': [state.to_dict() for state in self.ema.values()],
+                'macd': self.macd.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = cls(windows=())
+        indicators.rsi = RSIState.from_dict(state['rsi'])
+        indicators.sma = {s['window']: SMAState.from_dict(s) for s in state['sma']}
+        indicators.ema = {s['span']: EMAState.from_dict(s) for s in state['ema']}
+        indicators.macd = MACDState.from_dict(state['macd'])
+        return indicators
@@ -1,5 +1,18 @@
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from company_index import CompanyIndex
+from data_processing import find_data_path, list_company_codes, load_company_data
+from indicator_cache import IndicatorCache
+from price_schema import normalize_company_data
+from streaming_indicators import IndicatorState
 
 
 # Function to calculate RSI
@@ -50,24 +63,198 @@ def calculate_indicators(company_df):
     return result
 
 
-# Main part of the program
-if __name__ == '__main__':
+# Function to build a padded issuers x days price matrix from rows sorted by (CompanyCode, Date).
+# Returns the matrix and the (row, column) position of every input row in it.
+def price_matrix(prices, starts, lengths):
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(len(prices)) - np.repeat(starts, lengths)
+    matrix = np.full((len(lengths), lengths.max() if len(lengths) else 0), np.nan)
+    matrix[rows, columns] = prices
+    return matrix, rows, columns
 
-    # Path to the input CSV file
-    file_path = 'company_data.csv'
 
-    # Load the data
-    print(f"Loading data from {file_path}...")
-    data = pd.read_csv(file_path)
+# Function to calculate a rolling mean along each row, NaN until the window is full and while it
+# holds a missing value, like Series.rolling(window).mean()
+def rolling_mean_matrix(matrix, window):
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= window:
+        result[:, window - 1:] = sliding_window_view(matrix, window, axis=1).mean(axis=-1)
+    return result
+
+
+# Function to calculate Series.ewm(span=span, adjust=False).mean() along each row. The loop runs
+# over days only, every step updates all issuers at once.
+def ewm_matrix(matrix, span):
+    alpha = 2.0 / (span + 1)
+    result = np.empty(matrix.shape)
+    if matrix.shape[1] == 0:
+        return result
+    weighted = matrix[:, 0].copy()
+    old_weight = np.ones(len(matrix))
+    result[:, 0] = weighted
+    for day in range(1, matrix.shape[1]):
+        price = matrix[:, day]
+        started = ~np.isnan(weighted)
+        observed = ~np.isnan(price)
+        old_weight = np.where(started, old_weight * (1.0 - alpha), old_weight)
+        update = started & observed & (weighted != price)
+        with np.errstate(invalid='ignore'):
+            averaged = (old_weight * weighted + alpha * price) / (old_weight + alpha)
+        weighted = np.where(update, averaged, weighted)
+        old_weight = np.where(started & observed, 1.0, old_weight)
+        weighted = np.where(~started & observed, price, weighted)
+        result[:, day] = weighted
+    return result
+
+
+# Function to calculate RSI along each row, the same as calculate_rsi
+def rsi_matrix(matrix, period=14):
+    delta = np.full(matrix.shape, np.nan)
+    delta[:, 1:] = np.diff(matrix, axis=1)
+    gain = rolling_mean_matrix(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean_matrix(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+# Function to calculate all indicators for every company in one pass over a padded price matrix,
+# instead of one pandas pipeline per company. Returns the rows sorted by (CompanyCode, Date) with
+# the indicator columns of calculate_indicators and the streaming state after each company's last
+# row, keyed by company code.
+def calculate_indicators_batch(data, windows=(5, 10, 20)):
+    index = CompanyIndex(data)
+    codes = index.companies()
+    starts = np.array([index.bounds[code][0] for code in codes], dtype='int64')
+    lengths = np.array([index.bounds[code][1] - index.bounds[code][0] for code in codes], dtype='int64')
+    matrix, rows, columns = price_matrix(index.data['LastTradePrice'].to_numpy(dtype='float64'), starts, lengths)
+
+    indicators = {'RSI': rsi_matrix(matrix)}
+    emas = {}
+    for window in windows:
+        emas[window] = ewm_matrix(matrix, window)
+        indicators[f'SMA_{window}'] = rolling_mean_matrix(matrix, window)
+        indicators[f'EMA_{window}'] = emas[window]
+    emas[12] = ewm_matrix(matrix, 12)
+    emas[26] = ewm_matrix(matrix, 26)
+    indicators['MACD'] = emas[12] - emas[26]
+    indicators['Signal_Line'] = ewm_matrix(indicators['MACD'], 9)
+
+    result = index.data.copy()
+    for name, values in indicators.items():
+        result[name] = values[rows, columns]
+
+    states = {}
+    for row, code in enumerate(codes):
+        last = lengths[row] - 1
+        states[code] = IndicatorState.from_history(
+            matrix[row, :lengths[row]],
+            {span: values[row, last] for span, values in emas.items()},
+            indicators['Signal_Line'][row, last],
+            windows)
+    return result, states
+
 
-    # Ensure the 'Date' column is properly parsed
-    data['Date'] = pd.to_datetime(data['Date'], format='%d.%m.%Y')
+# Function to cap the address space of a worker process, so one oversized shard fails with a
+# MemoryError instead of pushing the whole machine into swap
+def limit_worker_memory(max_memory_mb):
+    try:
+        import resource
+    except ImportError:
+        # The resource module only exists on Unix; on Windows the workers run without a cap
+        return
+    limit = max_memory_mb * 2**20
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
 
-    # Ensure 'LastTradePrice' is numeric
-    data['LastTradePrice'] = pd.to_numeric(data['LastTradePrice'].str.replace(',', ''), errors='coerce')
 
-    # Group the data by company
-    grouped_data = data.groupby('CompanyCode')
+# Function to refresh the indicators of one shard of companies in a worker process. The worker
+# loads only the rows of its own companies, unless the parent passes them in, and hands its
+# manifest entries back to the parent, which is the only process that writes the manifest.
+def refresh_shard(file_path, output_dir, company_codes, rows=None):
+    started = time.perf_counter()
+    data = rows if rows is not None else normalize_company_data(load_company_data(file_path, company_codes))
+    cache = IndicatorCache(output_dir)
+    outcomes = cache.refresh_all(data, calculate_indicators_batch)
+    entries = {company_code: cache.manifest[company_code] for company_code in outcomes}
+    return outcomes, entries, len(data), time.perf_counter() - started
+
+
+# Function to deal companies round-robin over at most shard_count non-empty shards
+def make_shards(company_codes, shard_count):
+    shard_count = max(1, min(len(company_codes), shard_count))
+    return [company_codes[i::shard_count] for i in range(shard_count)]
+
+
+# Function to split the rows of a CSV source by shard. A CSV file cannot be read one company at a
+# time, so it is parsed once here instead of once in every worker.
+def shard_rows(file_path, shard_count):
+    data = normalize_company_data(load_company_data(file_path))
+    company_codes = sorted(data['CompanyCode'].astype(str).unique())
+    shards = make_shards(company_codes, shard_count)
+    shard_of = {company_code: number for number, shard in enumerate(shards) for company_code in shard}
+    numbers = data['CompanyCode'].astype(str).map(shard_of)
+    return shards, [data[numbers == number] for number in range(len(shards))]
+
+
+# Function to refresh all companies across a process pool, one shard of companies per task.
+# Issuers are dealt round-robin over more shards than workers so a slow shard does not hold up
+# the whole run. Shards whose worker ran out of memory or died are recomputed in this process;
+# companies that still do not fit are reported as 'skipped'.
+def refresh_parallel(file_path, cache, workers, max_memory_mb):
+    if os.path.splitext(file_path)[1] == '.csv':
+        shards, rows = shard_rows(file_path, workers * 4)
+    else:
+        shards = make_shards(list_company_codes(file_path), workers * 4)
+        rows = [None] * len(shards)
+
+    outcomes = {}
+    failed = []
+
+    def collect(number, result):
+        shard_outcomes, entries, row_count, seconds = result
+        cache.manifest.update(entries)
+        outcomes.update(shard_outcomes)
+        print(f"Shard {number}: {len(shard_outcomes)} companies, {row_count} rows in {seconds:.2f}s")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_worker_memory,
+                             initargs=(max_memory_mb,)) as executor:
+        futures = {executor.submit(refresh_shard, file_path, cache.cache_dir, shard, shard_data): number
+                   for number, (shard, shard_data) in enumerate(zip(shards, rows))}
+        for future in as_completed(futures):
+            number = futures[future]
+            try:
+                collect(number, future.result())
+            except (MemoryError, BrokenProcessPool) as e:
+                # A worker killed at the memory limit breaks the pool, failing every unfinished shard
+                print(f"Shard {number} ({len(shards[number])} companies) failed in its worker: {e.__class__.__name__}")
+                failed.append(number)
+
+    for number in sorted(failed):
+        try:
+            collect(number, refresh_shard(file_path, cache.cache_dir, shards[number], rows[number]))
+        except MemoryError:
+            print(f"Shard {number} ({len(shards[number])} companies) does not fit in memory and was skipped.")
+            outcomes.update({company_code: 'skipped' for company_code in shards[number]})
+    if failed:
+        print(f"{len(failed)} of {len(shards)} shards were recomputed in this process after their worker failed.")
+    return outcomes
+
+
+# Main part of the program
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calculate technical indicators for all companies.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes; 1 runs in this process, 0 uses every core")
+    parser.add_argument('--max-memory-mb', type=int, default=2048,
+                        help="address space limit of each worker process in MiB")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count()
+
+    # Columnar snapshot, SQLite store or CSV file, whichever exists
+    file_path = find_data_path()
+    print(f"Loading data from {file_path}...")
 
     # Directory to save the results
     output_dir = "data"
@@ -76,14 +263,20 @@ if __name__ == '__main__':
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Calculate indicators and save results for each company
-    for company_name, company_df in grouped_data:
-        print(f"Processing company: {company_name}")
-
-        # Calculate indicators for the company
-        indicators_df = calculate_indicators(company_df)
-
-        # Save the results to a CSV file in the 'data' directory
-        output_file = os.path.join(output_dir, f"{company_name}_indicators.csv")
-        indicators_df.to_csv(output_file, index=False)
-        print(f"Indicators saved for {company_name} in {output_file}")
\ No newline at end of file
+    # Bring the cached indicators of every company up to date; unchanged companies are skipped,
+    # companies with only new days get just the new tail appended and all other companies are
+    # recomputed together in one batch (per shard when running in parallel)
+    started = time.perf_counter()
+    cache = IndicatorCache(output_dir)
+    if workers > 1:
+        results = refresh_parallel(file_path, cache, workers, args.max_memory_mb)
+    else:
+        results = cache.refresh_all(normalize_company_data(load_company_data(file_path)), calculate_indicators_batch)
+    outcomes = {'unchanged': 0, 'extended': 0, 'rebuilt': 0, 'skipped': 0}
+    for company_name, outcome in results.items():
+        outcomes[outcome] += 1
+        if outcome in ('extended', 'rebuilt'):
+            print(f"Indicators {outcome} for {company_name} in {cache.output_path(company_name)}")
+    cache.save()
+    print(f"Indicator cache: {outcomes['unchanged']} unchanged, {outcomes['extended']} extended, "
+          f"{outcomes['rebuilt']} rebuilt, {outcomes['skipped']} skipped in {time.perf_counter() - started:.2f}s.")
@@ -1,50 +1,160 @@
 from flask import Flask, request, jsonify, render_template
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import plotly.graph_objs as go
 import requests
+from requests.adapters import HTTPAdapter
 import os
 
+from company_index import CompanyIndex
+from data_processing import find_data_path, load_company_data, preprocess_data
+from data_reloader import DataReloader, DataSnapshot
+from resampling import build_bars
+from signals import signal_series, summarize_signals
+from wire_format import CONTENT_TYPE, decode_columns, encode_columns
+
 app = Flask(__name__)
 
-# Base URLs for microservices
-RSI_SERVICE_URL = "http://rsi-service:5001/calculate_rsi"
-MOVING_AVERAGE_SERVICE_URL = "http://moving-average-service:5002/calculate_moving_averages"
-MACD_SERVICE_URL = "http://macd-service:5003/calculate_macd"
+# Base URLs for microservices, overridable to point the gateway at other (e.g. local) instances
+RSI_SERVICE_URL = os.environ.get('RSI_SERVICE_URL', "http://rsi-service:5001/calculate_rsi")
+MOVING_AVERAGE_SERVICE_URL = os.environ.get('MOVING_AVERAGE_SERVICE_URL',
+                                            "http://moving-average-service:5002/calculate_moving_averages")
+MACD_SERVICE_URL = os.environ.get('MACD_SERVICE_URL', "http://macd-service:5003/calculate_macd")
+
+# Batch service that computes every selected indicator in one round trip; set it to an empty value
+# to call the three services above in parallel instead
+INDICATOR_SERVICE_URL = os.environ.get('INDICATOR_SERVICE_URL', "http://indicator-service:5004/calculate_indicators")
+
+# Seconds to wait for a connection to a service and for its answer
+SERVICE_CONNECT_TIMEOUT = float(os.environ.get('SERVICE_CONNECT_TIMEOUT', 2))
+SERVICE_TIMEOUT = float(os.environ.get('SERVICE_TIMEOUT', 10))
+
+# Keep-alive connections to the services, shared by all requests, and the threads that call the
+# services of one request in parallel
+SERVICE_POOL_SIZE = int(os.environ.get('SERVICE_POOL_SIZE', 16))
 
-# Path to the CSV file
-DATA_PATH = os.path.join("data", "company_data.csv")
+# Let the services read daily series from the shared data volume instead of receiving them
+SERVICE_DATA_BY_REFERENCE = os.environ.get('SERVICE_DATA_BY_REFERENCE', '1') == '1'
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=SERVICE_POOL_SIZE))
+service_pool = ThreadPoolExecutor(max_workers=SERVICE_POOL_SIZE)
+
+# Path to the columnar snapshot, the SQLite store, or the CSV file, whichever exists
+DATA_PATH = find_data_path()
 
 # Check if the file exists
 if not os.path.exists(DATA_PATH):
     raise FileNotFoundError(f"File not found: {DATA_PATH}")
 
-# Read the CSV file into a DataFrame
-data = pd.read_csv(DATA_PATH, low_memory=False)
-
-# Ensure the 'Date' column is properly parsed
-if 'Date' in data.columns:
-    data['Date'] = pd.to_datetime(data['Date'], format='%d.%m.%Y')
-else:
-    raise ValueError("The 'Date' column is missing in the CSV file.")
 
-# Ensure 'LastTradePrice' is numeric
-if 'LastTradePrice' in data.columns:
-    data['LastTradePrice'] = pd.to_numeric(data['LastTradePrice'].str.replace(',', ''), errors='coerce')
-else:
-    raise ValueError("The 'LastTradePrice' column is missing in the CSV file.")
-
-print(data.head())  # Печати ги првите неколку редови од CSV фајлот
-print(data.columns)  # Печати ги колоните за да осигурате дека се правилни
+# Function to load one version of the data with its company index and bars
+def build_snapshot(file_path, version, previous):
+    # Read the data into a DataFrame, only the columns the analysis and the weekly and monthly bars use
+    data = load_company_data(file_path, columns=['CompanyCode', 'Date', 'LastTradePrice', 'Max', 'Min',
+                                                 'Volume', 'TurnoverBESTMKD', 'TurnoverTotalMKD'])
+
+    # Ensure the required columns are present
+    for column in ('Date', 'LastTradePrice'):
+        if column not in data.columns:
+            raise ValueError(f"The '{column}' column is missing in the data file.")
+
+    # Parse dates, prices and company codes once into the compact typed schema
+    data = preprocess_data(data)
+
+    # Contiguous, date-sorted rows per company, looked up by code
+    index = CompanyIndex(data)
+
+    # Weekly and monthly OHLCV bars, refreshed from the previous version's bars on a reload
+    return DataSnapshot(version, data, index, build_bars(index, previous.bars if previous is not None else None))
+
+
+# The data is reloaded in the background when a scraper run rewrites the file
+reloader = DataReloader(DATA_PATH, build_snapshot, interval=int(os.environ.get('RELOAD_INTERVAL', 30))).start()
+
+print(reloader.snapshot.data.head())  # Печати ги првите неколку редови од CSV фајлот
+print(reloader.snapshot.data.columns)  # Печати ги колоните за да осигурате дека се правилни
+
+
+# Function to read the {output name: values} answer of an indicator service; services that still
+# answer in JSON are read as well
+def read_service_response(response):
+    response.raise_for_status()
+    if response.headers.get('Content-Type', '').startswith(CONTENT_TYPE):
+        columns, _ = decode_columns(response.content)
+        return columns
+    body = response.json()
+    return body if isinstance(body, dict) else {'RSI': body}
+
+
+# Function to call one indicator service. With a reference ({company, version}) the service reads
+# the series from the shared data volume itself; if it saw another version of the data file
+# (e.g. during a reload) the call is repeated with the prices in the columnar format. params are
+# passed along with the series, e.g. the indicator specs of the batch service.
+def call_service(url, prices, reference=None, params=None):
+    timeout = (SERVICE_CONNECT_TIMEOUT, SERVICE_TIMEOUT)
+    if reference is not None:
+        response = session.post(url, json={**reference, **(params or {})}, headers={'Accept': CONTENT_TYPE},
+                                timeout=timeout)
+        if response.ok and response.headers.get('X-Data-Version') == reference['version']:
+            return read_service_response(response)
+    response = session.post(url, data=encode_columns({'LastTradePrice': prices}, params),
+                            headers={'Content-Type': CONTENT_TYPE, 'Accept': CONTENT_TYPE}, timeout=timeout)
+    return read_service_response(response)
+
+
+# Function to turn the selected indicator names into the specs of the batch service
+def indicator_specs(indicators):
+    specs = []
+    if 'RSI' in indicators:
+        specs.append({'name': 'RSI', 'period': 14})
+    for indicator in indicators:
+        if indicator.startswith(('SMA_', 'EMA_')):
+            name, window = indicator.split('_')
+            specs.append({'name': name, 'window': int(window)})
+    if 'MACD' in indicators or 'Signal_Line' in indicators:
+        specs.append({'name': 'MACD', 'short_window': 12, 'long_window': 26, 'signal_window': 9})
+    return specs
+
+
+# Function to fetch the selected indicators: in one call to the batch service, or by calling every
+# single-indicator service that is needed at the same time, so a request waits for the slowest
+# service rather than for all of them in turn
+def fetch_indicators(prices, indicators, reference=None):
+    calls = {}
+    specs = indicator_specs(indicators)
+    if INDICATOR_SERVICE_URL:
+        if specs:
+            calls['indicator-service'] = (INDICATOR_SERVICE_URL, {'indicators': specs})
+    else:
+        if 'RSI' in indicators:
+            calls['rsi-service'] = (RSI_SERVICE_URL, None)
+        if any(indicator.startswith(('SMA_', 'EMA_')) for indicator in indicators):
+            calls['moving-average-service'] = (MOVING_AVERAGE_SERVICE_URL, None)
+        if 'MACD' in indicators or 'Signal_Line' in indicators:
+            calls['macd-service'] = (MACD_SERVICE_URL, None)
+
+    futures = {name: service_pool.submit(call_service, url, prices, reference, params)
+               for name, (url, params) in calls.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results.update(future.result())
+        except requests.Timeout:
+            raise RuntimeError(f"{name} did not answer within {SERVICE_TIMEOUT:g}s")
+        except requests.RequestException as e:
+            raise RuntimeError(f"{name} failed: {e}")
+    return results
 
 
 @app.route('/')
 def index():
     # Get unique company codes for dropdown selection
-    companies = data['CompanyCode'].drop_duplicates().tolist()
+    companies = reloader.snapshot.index.companies()
     print(companies)  # Печати ја листата на компании
     return render_template('index.html', companies=companies)
 
 
-print(data['CompanyCode'].head())  # Печати ги првите неколку вредности од колоната
+print(reloader.snapshot.data['CompanyCode'].head())  # Печати ги првите неколку вредности од колоната
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
@@ -54,37 +164,49 @@ def analyze():
         indicators = request.form.getlist('indicators')
         timeframe = request.form.get('timeframe', 'daily')
 
-        # Filter data for the selected company
-        company_data = data[data['CompanyCode'] == company_code]
+        # Look up the date-sorted rows of the selected company in the current data version
+        snapshot = reloader.snapshot
+        company_data = snapshot.index.get(company_code)
 
         if company_data.empty:
             raise ValueError(f"No data available for the selected company: {company_code}")
 
-        # Filter data based on timeframe
-        if timeframe == 'weekly':
-            filtered_data = company_data.tail(7)
-        elif timeframe == 'monthly':
-            filtered_data = company_data.tail(30)
+        # Daily rows, or the precomputed weekly or monthly bars with the close as the price
+        if timeframe in snapshot.bars:
+            filtered_data = snapshot.bars[timeframe].get(company_code).rename(columns={'Close': 'LastTradePrice'})
         else:
             filtered_data = company_data
 
         if filtered_data.empty:
             raise ValueError(f"No data available for the selected timeframe: {timeframe}")
 
-        # Replace problematic values
-        filtered_data = filtered_data.replace([float('inf'), float('-inf')], None)
-        filtered_data = filtered_data.fillna(0)
-
-        # Convert to dictionary for JSON serialization
-        filtered_data_dict = filtered_data.to_dict(orient='records')
+        # Indicators from the services, one column per output, aligned with the rows. Daily series
+        # are passed by reference; the bars only exist here and are sent as prices.
+        prices = filtered_data['LastTradePrice'].to_numpy(dtype='float64')
+        reference = None
+        if SERVICE_DATA_BY_REFERENCE and timeframe not in snapshot.bars:
+            reference = {'company': company_code, 'version': snapshot.version}
+        indicators_df = pd.DataFrame(fetch_indicators(prices, indicators, reference))
+        indicators_df['Date'] = filtered_data['Date'].to_numpy()
+        indicators_df['LastTradePrice'] = prices
+
+        # Count buy, sell, and hold signals over the selected indicators
+        signals = summarize_signals(signal_series(indicators_df, indicators))
+
+        # Generate Plotly graph using selected indicators
+        fig = go.Figure()
+        for indicator in indicators:
+            if indicator in indicators_df.columns:
+                fig.add_trace(go.Scatter(
+                    x=indicators_df['Date'],
+                    y=indicators_df[indicator],
+                    mode='lines',
+                    name=indicator
+                ))
 
-        # Prepare results dictionary (example)
         results = {
-            "signals": {"buy": 5, "sell": 3, "hold": 2},  # Example signals
-            "graph": {
-                "data": [{"x": [1, 2, 3], "y": [4, 5, 6], "type": "scatter"}],
-                "layout": {"title": "Example Graph"}
-            }
+            "signals": signals,
+            "graph": fig.to_json()
         }
 
         return jsonify(results)
@@ -96,7 +218,7 @@ def analyze():
 @app.route('/get_companies', methods=['GET'])
 def get_companies():
     # Извлекување на уникатни компании од CSV фајлот
-    companies = data['CompanyCode'].drop_duplicates().tolist()
+    companies = reloader.snapshot.index.companies()
     return jsonify({'companies': companies})
 
 
@@ -0,0 +1,60 @@
+import importlib.util
+import json
+import os
+import timeit
+
+import numpy as np
+
+from wire_format import CONTENT_TYPE, decode_columns, encode_columns
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+SERIES_LENGTHS = [250, 2500, 25000]
+
+
+# Load a service's Flask app from its directory and return a test client, so a round trip covers
+# request encoding, parsing, the indicator maths and response decoding without a network hop
+def service_client(directory):
+    spec = importlib.util.spec_from_file_location(directory.replace('-', '_'),
+                                                  os.path.join(SRC_DIR, directory, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app.test_client()
+
+
+def round_trips(client, route, prices):
+    rows = [{'LastTradePrice': price} for price in prices.tolist()]
+
+    def json_path():
+        response = client.post(route, data=json.dumps({'data': rows}), content_type='application/json')
+        json.loads(response.get_data())
+        return len(json.dumps({'data': rows})), len(response.get_data())
+
+    def binary_path():
+        body = encode_columns({'LastTradePrice': prices})
+        response = client.post(route, data=body, content_type=CONTENT_TYPE, headers={'Accept': CONTENT_TYPE})
+        decode_columns(response.get_data())
+        return len(body), len(response.get_data())
+
+    return {'json': json_path, 'binary': binary_path}
+
+
+if __name__ == '__main__':
+    services = {
+        'rsi-service': '/calculate_rsi',
+        'moving-average-service': '/calculate_moving_averages',
+        'macd-service': '/calculate_macd',
+        'indicator-service': '/calculate_indicators',
+    }
+    rng = np.random.default_rng(0)
+    for directory, route in services.items():
+        client = service_client(directory)
+        print(f"{directory} {route}")
+        for length in SERIES_LENGTHS:
+            prices = np.round(1000 + np.cumsum(rng.normal(0, 5, length)), 2)
+            paths = round_trips(client, route, prices)
+            timings = {name: min(timeit.repeat(path, repeat=5, number=3)) / 3 for name, path in paths.items()}
+            for name, path in paths.items():
+                request_size, response_size = path()
+                print(f"  {length:>6} points  {name:<6} request {request_size / 1024:8.1f} KiB  "
+                      f"response {response_size / 1024:8.1f} KiB  {timings[name] * 1000:8.2f} ms  "
+                      f"{timings['json'] / timings[name]:5.1f}x")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+class CompanyIndex:
+    """
+    Prebuilt per-company index over the daily history.
+
+    Rows are sorted once by (CompanyCode, Date) so every issuer occupies one contiguous,
+    date-ordered block. Looking up a company is a dict access to its block bounds and a
+    date window is found by binary search inside the block, so neither grows with the
+    number of issuers or rows in the frame.
+    """
+
+    def __init__(self, data):
+        data = data.sort_values(['CompanyCode', 'Date'], kind='mergesort').reset_index(drop=True)
+        codes = data['CompanyCode'].astype(str).to_numpy()
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)) if len(codes) else np.array([], dtype=int)
+        stops = np.concatenate((boundaries, [len(codes)])) if len(codes) else np.array([], dtype=int)
+
+        self.data = data
+        self.dates = data['Date'].to_numpy()
+        self.bounds = {codes[start]: (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+    def __contains__(self, company_code):
+        return company_code in self.bounds
+
+    def __len__(self):
+        return len(self.data)
+
+    def companies(self):
+        return list(self.bounds)
+
+    def get(self, company_code):
+        """
+        All rows of one company in date order, or an empty frame for an unknown code.
+        """
+        start, stop = self.bounds.get(company_code, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def window_bounds(self, company_code, start_date=None, end_date=None):
+        """
+        Positions (low, high), relative to the company's first row, of the rows with
+        start_date <= Date <= end_date; either bound may be omitted.
+        """
+        start, stop = self.bounds.get(company_code, (0, 0))
+        dates = self.dates[start:stop]
+        low, high = 0, stop - start
+        if start_date is not None:
+            low = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date)), side='left'))
+        if end_date is not None:
+            high = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date)), side='right'))
+        return low, max(low, high)
+
+    def window(self, company_code, start_date=None, end_date=None):
+        """
+        Rows of one company with start_date <= Date <= end_date; either bound may be omitted.
+        """
+        start, _ = self.bounds.get(company_code, (0, 0))
+        low, high = self.window_bounds(company_code, start_date, end_date)
+        return self.data.iloc[start + low:start + high]
+
+    def last_date(self, company_code):
+        start, stop = self.bounds.get(company_code, (0, 0))
+        if start == stop:
+            return None
+        return pd.Timestamp(self.dates[stop - 1])
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from data_processing import dataset_version
+
+
+class DataSnapshot:
+    """
+    One loaded version of the data: the typed frame, its company index, the weekly and
+    monthly bars and any other objects built from it. A snapshot is never modified after it is built; a reload
+    builds a new one.
+    """
+
+    def __init__(self, version, data, index, bars=None, indicator_cache=None):
+        self.version = version
+        self.data = data
+        self.index = index
+        self.bars = bars or {}
+        self.indicator_cache = indicator_cache
+
+
+class DataReloader:
+    """
+    Keeps the current DataSnapshot of a data file and replaces it when the file changes.
+
+    build(file_path, version, previous) loads and indexes the data off the request path, in
+    a background thread, and may reuse work from the previous snapshot (None at startup).
+    The finished snapshot is swapped in with a single assignment.
+    A request reads reloader.snapshot once and keeps using that object, so requests in
+    flight finish on the version they started with. If a build fails the old snapshot
+    stays in place and the next check tries again.
+    """
+
+    def __init__(self, file_path, build, interval=30, on_reload=None):
+        self.file_path = file_path
+        self.build = build
+        self.interval = interval
+        self.on_reload = on_reload
+        self.lock = threading.Lock()
+        self.thread = None
+        version = dataset_version(file_path)
+        self.snapshot = build(file_path, version, None)
+
+    def check(self):
+        """
+        Build and swap in a new snapshot if the data file changed. Returns True on a swap.
+        """
+        with self.lock:
+            version = dataset_version(self.file_path)
+            if version == self.snapshot.version:
+                return False
+            started = time.perf_counter()
+            snapshot = self.build(self.file_path, version, self.snapshot)
+            self.snapshot = snapshot
+            print(f"Reloaded {self.file_path} (version {version}) in {time.perf_counter() - started:.2f}s")
+        if self.on_reload is not None:
+            self.on_reload(snapshot)
+        return True
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Reloading {self.file_path} failed, keeping version {self.snapshot.version}: {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="data-reloader", daemon=True)
+            self.thread.start()
+        return self
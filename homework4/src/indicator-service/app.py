@@ -0,0 +1,138 @@
+from flask import Flask, request, jsonify
+import os
+import numpy as np
+import pandas as pd
+
+from series_store import SeriesStore
+from wire_format import columnar_response, decode_columns, is_columnar, wants_columnar
+
+app = Flask(__name__)
+
+# Series requested by company are read from the shared data volume, recently used ones cached
+store = SeriesStore(os.environ.get('DATA_DIR', 'data'), int(os.environ.get('SERIES_CACHE_SIZE', 32)))
+
+# Indicator set computed when a request does not list any
+DEFAULT_INDICATORS = [
+    {"name": "RSI", "period": 14},
+    {"name": "SMA", "window": 5}, {"name": "EMA", "window": 5},
+    {"name": "SMA", "window": 10}, {"name": "EMA", "window": 10},
+    {"name": "SMA", "window": 20}, {"name": "EMA", "window": 20},
+    {"name": "MACD", "short_window": 12, "long_window": 26, "signal_window": 9},
+]
+
+
+# Function to clean a result the same way as the single-indicator services: infinities become NaN,
+# which the columnar format carries as it is
+def clean(series):
+    return series.replace([float('inf'), float('-inf')], float('nan'))
+
+
+# Function to convert a result for a JSON response, which cannot carry NaN
+def json_values(series):
+    return series.fillna(0).tolist()
+
+
+# Function to calculate one indicator spec over a price series, as {output name: values}
+def calculate_spec(prices, spec):
+    name = spec.get('name')
+    if name == 'RSI':
+        period = spec.get('period', 14)
+        delta = prices.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        rsi = 100 - (100 / (1 + gain / loss))
+        return {'RSI': clean(rsi)}
+    if name == 'SMA':
+        window = spec.get('window', 5)
+        return {f'SMA_{window}': clean(prices.rolling(window=window).mean())}
+    if name == 'EMA':
+        window = spec.get('window', 5)
+        return {f'EMA_{window}': clean(prices.ewm(span=window, adjust=False).mean())}
+    if name == 'MACD':
+        short_ema = prices.ewm(span=spec.get('short_window', 12), adjust=False).mean()
+        long_ema = prices.ewm(span=spec.get('long_window', 26), adjust=False).mean()
+        macd = short_ema - long_ema
+        signal_line = macd.ewm(span=spec.get('signal_window', 9), adjust=False).mean()
+        return {'MACD': clean(macd), 'Signal_Line': clean(signal_line)}
+    raise ValueError(f"Unknown indicator: {name}")
+
+
+# Function to read the prices of one series, given as a list of prices, as row records or as a
+# company (with optional 'start' and 'end' dates) read from the shared store. Returns the prices
+# and the data version, which is None unless the series came from the store.
+def series_prices(series):
+    if 'prices' in series:
+        return pd.Series(series['prices'], dtype='float64'), None
+    if 'data' in series:
+        return pd.DataFrame(series['data'])['LastTradePrice'].astype('float64'), None
+    prices, version = store.prices(series['company'], series.get('start'), series.get('end'))
+    return pd.Series(prices), version
+
+
+# Function to calculate every indicator spec over one price series
+def calculate_all(prices, specs):
+    results = {}
+    for spec in specs:
+        results.update(calculate_spec(prices, spec))
+    return results
+
+
+# Function to read the price series of a request, with the company names when there are several
+# and the data version of series read from the store
+def read_series(request):
+    if is_columnar(request):
+        # One LastTradePrice column with the series back to back, split by the 'lengths' metadata
+        columns, params = decode_columns(request.get_data())
+        prices = columns['LastTradePrice']
+        bounds = np.cumsum([0] + params.get('lengths', [len(prices)]))
+        series = [pd.Series(prices[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+        return series, params.get('companies'), params, None
+    params = request.json
+    if 'series' in params:
+        read = [series_prices(series) for series in params['series']]
+        companies = [series['company'] for series in params['series']]
+    else:
+        read = [series_prices(params)]
+        companies = None
+    versions = [version for _, version in read if version is not None]
+    return [prices for prices, _ in read], companies, params, versions[-1] if versions else None
+
+
+@app.route('/calculate_indicators', methods=['POST'])
+def calculate_indicators():
+    """
+    All requested indicators in one round trip. The body holds either one series
+    ("prices" or "data" rows, as for the single-indicator services) or "series", a list of
+    {"company", "prices" or "data"} objects, plus "indicators", a list of specs such as
+    {"name": "SMA", "window": 10}. One series returns {output name: values}; several
+    return {"companies": {company: {output name: values}}}.
+
+    Instead of prices a series can name a "company", with optional "start" and "end"
+    dates, to be read from the shared store; the data version used is returned in the
+    X-Data-Version header. In the columnar format the request carries the series back to back in one
+    LastTradePrice column, with "companies", "lengths" and "indicators" as metadata, and
+    the response carries every output the same way.
+    """
+    try:
+        series, companies, params, version = read_series(request)
+        specs = params.get('indicators') or DEFAULT_INDICATORS
+        results = [calculate_all(prices, specs) for prices in series]
+
+        if wants_columnar(request):
+            names = list(results[0]) if results else []
+            columns = {name: np.concatenate([result[name].to_numpy() for result in results]) for name in names}
+            response = columnar_response(columns, {'companies': companies, 'lengths': [len(prices) for prices in series]})
+        elif companies is None:
+            response = jsonify({name: json_values(values) for name, values in results[0].items()})
+        else:
+            response = jsonify({"companies": {company: {name: json_values(values) for name, values in result.items()}
+                                              for company, result in zip(companies, results)}})
+        if version is not None:
+            response.headers['X-Data-Version'] = version
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5004)
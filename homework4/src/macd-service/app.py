@@ -1,30 +1,37 @@
 from flask import Flask, request, jsonify
+import os
 import pandas as pd
 
+from series_store import SeriesStore
+from wire_format import indicator_response, read_prices
+
 app = Flask(__name__)
 
+# Series requested by company are read from the shared data volume, recently used ones cached
+store = SeriesStore(os.environ.get('DATA_DIR', 'data'), int(os.environ.get('SERIES_CACHE_SIZE', 32)))
+
 @app.route('/calculate_macd', methods=['POST'])
 def calculate_macd():
     try:
-        data = request.json['data']
-        short_window = request.json.get('short_window', 12)
-        long_window = request.json.get('long_window', 26)
-        signal_window = request.json.get('signal_window', 9)
-
-        df = pd.DataFrame(data)
-        short_ema = df['LastTradePrice'].ewm(span=short_window, adjust=False).mean()
-        long_ema = df['LastTradePrice'].ewm(span=long_window, adjust=False).mean()
+        prices, params, version = read_prices(request, store)
+        short_window = params.get('short_window', 12)
+        long_window = params.get('long_window', 26)
+        signal_window = params.get('signal_window', 9)
+
+        prices = pd.Series(prices, dtype='float64')
+        short_ema = prices.ewm(span=short_window, adjust=False).mean()
+        long_ema = prices.ewm(span=long_window, adjust=False).mean()
         macd = short_ema - long_ema
         signal_line = macd.ewm(span=signal_window, adjust=False).mean()
 
-        # Replace NaN and inf values
-        macd = macd.replace([float('inf'), float('-inf')], None).fillna(0)
-        signal_line = signal_line.replace([float('inf'), float('-inf')], None).fillna(0)
+        # Missing prices stay NaN in the columnar format; JSON cannot carry NaN, so there they are 0
+        macd = macd.replace([float('inf'), float('-inf')], float('nan'))
+        signal_line = signal_line.replace([float('inf'), float('-inf')], float('nan'))
 
-        return jsonify({
-            "MACD": macd.tolist(),
-            "Signal_Line": signal_line.tolist()
-        })
+        return indicator_response({"MACD": macd, "Signal_Line": signal_line}, {
+            "MACD": macd.fillna(0).tolist(),
+            "Signal_Line": signal_line.fillna(0).tolist()
+        }, version)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
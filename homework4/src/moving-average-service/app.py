@@ -1,28 +1,35 @@
 from flask import Flask, request, jsonify
+import os
 import pandas as pd
 
+from series_store import SeriesStore
+from wire_format import indicator_response, read_prices
+
 app = Flask(__name__)
 
+# Series requested by company are read from the shared data volume, recently used ones cached
+store = SeriesStore(os.environ.get('DATA_DIR', 'data'), int(os.environ.get('SERIES_CACHE_SIZE', 32)))
+
 
 @app.route('/calculate_moving_averages', methods=['POST'])
 def calculate_moving_averages():
     try:
-        data = request.json['data']
-        windows = request.json.get('windows', [5, 10, 20])
-        df = pd.DataFrame(data)
+        prices, params, version = read_prices(request, store)
+        windows = params.get('windows', [5, 10, 20])
+        prices = pd.Series(prices, dtype='float64')
         ma_data = {}
         for window in windows:
-            sma = df['LastTradePrice'].rolling(window=window).mean()
-            ema = df['LastTradePrice'].ewm(span=window, adjust=False).mean()
+            sma = prices.rolling(window=window).mean()
+            ema = prices.ewm(span=window, adjust=False).mean()
 
-            # Replace NaN and inf values
-            sma = sma.replace([float('inf'), float('-inf')], None).fillna(0)
-            ema = ema.replace([float('inf'), float('-inf')], None).fillna(0)
+            # Warm-up rows stay NaN in the columnar format; JSON cannot carry NaN, so there they are 0
+            sma = sma.replace([float('inf'), float('-inf')], float('nan'))
+            ema = ema.replace([float('inf'), float('-inf')], float('nan'))
 
-            ma_data[f'SMA_{window}'] = sma.tolist()
-            ma_data[f'EMA_{window}'] = ema.tolist()
+            ma_data[f'SMA_{window}'] = sma
+            ma_data[f'EMA_{window}'] = ema
 
-        return jsonify(ma_data)
+        return indicator_response(ma_data, {name: values.fillna(0).tolist() for name, values in ma_data.items()}, version)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
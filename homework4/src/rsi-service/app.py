@@ -1,24 +1,30 @@
 from flask import Flask, request, jsonify
+import os
 import pandas as pd
 
+from series_store import SeriesStore
+from wire_format import indicator_response, read_prices
+
 app = Flask(__name__)
 
+# Series requested by company are read from the shared data volume, recently used ones cached
+store = SeriesStore(os.environ.get('DATA_DIR', 'data'), int(os.environ.get('SERIES_CACHE_SIZE', 32)))
+
 @app.route('/calculate_rsi', methods=['POST'])
 def calculate_rsi():
      try:
-         data = request.json['data']
-         period = request.json.get('period', 14)
-         df = pd.DataFrame(data)
-         delta = df['LastTradePrice'].diff()
+         prices, params, version = read_prices(request, store)
+         period = params.get('period', 14)
+         delta = pd.Series(prices, dtype='float64').diff()
          gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
          loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
          rs = gain / loss
          rsi = 100 - (100 / (1 + rs))
 
-         # Replace NaN and inf values
-         rsi = rsi.replace([float('inf'), float('-inf')], None).fillna(0)
+         # Warm-up rows stay NaN in the columnar format; JSON cannot carry NaN, so there they are 0
+         rsi = rsi.replace([float('inf'), float('-inf')], float('nan'))
 
-         return jsonify(rsi.tolist())
+         return indicator_response({'RSI': rsi}, rsi.fillna(0).tolist(), version)
      except Exception as e:
          return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_processing import dataset_version, find_data_path, load_company_data
+from price_schema import normalize_company_data
+
+
+class SeriesStore:
+    """
+    Daily price series of single companies, read from the shared data directory (the
+    Parquet snapshot, the SQLite store or the CSV file, whichever exists) so that callers
+    can pass a company and a date range instead of the prices themselves.
+
+    Recently used series are kept in a small LRU keyed by company and data version; a
+    new version of the data file is picked up on the next lookup.
+    """
+
+    def __init__(self, data_dir="data", max_entries=32):
+        self.data_dir = data_dir
+        self.max_entries = max_entries
+        self.series = OrderedDict()
+        self.lock = threading.Lock()
+
+    def version(self):
+        return dataset_version(find_data_path(self.data_dir))
+
+    def _load(self, company_code):
+        data = load_company_data(find_data_path(self.data_dir), company_code,
+                                 columns=['CompanyCode', 'Date', 'LastTradePrice'])
+        data = normalize_company_data(data).sort_values('Date', kind='mergesort')
+        return data['Date'].to_numpy(), data['LastTradePrice'].to_numpy(dtype='float64')
+
+    def prices(self, company_code, start_date=None, end_date=None):
+        """
+        (prices, version) of one company with start_date <= Date <= end_date, in date
+        order; either bound may be omitted.
+        """
+        version = self.version()
+        key = (company_code, version)
+        with self.lock:
+            cached = self.series.get(key)
+            if cached is not None:
+                self.series.move_to_end(key)
+        if cached is None:
+            cached = self._load(company_code)
+            with self.lock:
+                self.series[key] = cached
+                while len(self.series) > self.max_entries:
+                    self.series.popitem(last=False)
+
+        dates, prices = cached
+        low, high = 0, len(dates)
+        if start_date is not None:
+            low = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date)), side='left'))
+        if end_date is not None:
+            high = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date)), side='right'))
+        return prices[low:max(low, high)], version
@@ -0,0 +1,221 @@
+"""
+Tests of the gateway's /analyze against local stand-in services: the real indicator service
+apps served on local ports, each behind a middleware that can delay its answers.
+
+Run with: python -m pytest homework4/src
+"""
+import base64
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from werkzeug.serving import make_server
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SRC_DIR)
+
+from signals import signal_series, summarize_signals
+
+SERVICES = {
+    'rsi-service': ('/calculate_rsi', 'RSI_SERVICE_URL'),
+    'moving-average-service': ('/calculate_moving_averages', 'MOVING_AVERAGE_SERVICE_URL'),
+    'macd-service': ('/calculate_macd', 'MACD_SERVICE_URL'),
+    'indicator-service': ('/calculate_indicators', 'INDICATOR_SERVICE_URL'),
+}
+INDICATORS = ['RSI', 'SMA_5', 'EMA_5', 'SMA_10', 'EMA_10', 'SMA_20', 'EMA_20', 'MACD', 'Signal_Line']
+SERVICE_DELAY = 0.3
+
+
+def load_app(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_market(data_dir, companies=('ALK', 'KMB'), days=400):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2022-01-03', periods=days)
+    frames = []
+    for company in companies:
+        prices = np.round(1000 * np.exp(np.cumsum(rng.normal(0, 0.02, days))), 2)
+        frames.append(pd.DataFrame({
+            'CompanyCode': company, 'Date': dates.strftime('%d.%m.%Y'), 'LastTradePrice': prices,
+            'Max': prices * 1.01, 'Min': prices * 0.99, 'Volume': rng.integers(1, 500, days),
+            'TurnoverBESTMKD': 0, 'TurnoverTotalMKD': 0,
+        }))
+    os.makedirs(data_dir)
+    pd.concat(frames).to_csv(os.path.join(data_dir, 'company_data.csv'), index=False)
+
+
+class Delayed:
+    """
+    WSGI middleware that waits `delay` seconds before a service answers and records the
+    time span and request content type of every call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.delay = 0.0
+        self.calls = []
+        self.content_types = []
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        self.content_types.append(environ.get('CONTENT_TYPE', ''))
+        time.sleep(self.delay)
+        response = self.app(environ, start_response)
+        self.calls.append((started, time.perf_counter()))
+        return response
+
+
+@pytest.fixture(scope='module')
+def stack(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp('stack')
+    write_market(os.path.join(work_dir, 'data'))
+    patch = pytest.MonkeyPatch()
+    # The gateway finds the data at data/ under the working directory; the services are given the
+    # absolute path, as if the volume were mounted elsewhere
+    patch.chdir(work_dir)
+    patch.setenv('DATA_DIR', os.path.join(work_dir, 'data'))
+    patch.setenv('RELOAD_INTERVAL', '3600')
+
+    services, servers = {}, []
+    for directory, (route, variable) in SERVICES.items():
+        module = load_app(os.path.join(SRC_DIR, directory, 'app.py'), directory.replace('-', '_'))
+        services[directory] = Delayed(module.app.wsgi_app)
+        module.app.wsgi_app = services[directory]
+        server = make_server('127.0.0.1', 0, module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        patch.setenv(variable, f'http://127.0.0.1:{server.server_port}{route}')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        gateway = load_app(os.path.join(SRC_DIR, 'app.py'), 'gateway_app')
+    yield gateway, services
+
+    for server in servers:
+        server.shutdown()
+    patch.undo()
+
+
+@pytest.fixture
+def gateway(stack, monkeypatch):
+    gateway, services = stack
+    for service in services.values():
+        monkeypatch.setattr(service, 'delay', 0.0)
+        service.calls.clear()
+        service.content_types.clear()
+    return gateway, services
+
+
+def analyze(gateway, company='ALK', indicators=INDICATORS, timeframe='daily'):
+    response = gateway.app.test_client().post('/analyze', data={
+        'company': company, 'indicators': indicators, 'timeframe': timeframe})
+    return response.status_code, response.get_json()
+
+
+def reference_indicators(prices):
+    prices = pd.Series(prices, dtype='float64')
+    delta = prices.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    result = pd.DataFrame({'RSI': 100 - (100 / (1 + gain / loss))})
+    for window in (5, 10, 20):
+        result[f'SMA_{window}'] = prices.rolling(window=window).mean()
+        result[f'EMA_{window}'] = prices.ewm(span=window, adjust=False).mean()
+    result['MACD'] = prices.ewm(span=12, adjust=False).mean() - prices.ewm(span=26, adjust=False).mean()
+    result['Signal_Line'] = result['MACD'].ewm(span=9, adjust=False).mean()
+    return result
+
+
+# Plotly writes numeric arrays either as lists or as base64 typed arrays
+def trace_values(values):
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype'])
+    return np.array([np.nan if value is None else value for value in values], dtype='float64')
+
+
+def test_fan_out_calls_services_concurrently(gateway, monkeypatch):
+    gateway, services = gateway
+    monkeypatch.setattr(gateway, 'INDICATOR_SERVICE_URL', '')
+    single = ['rsi-service', 'moving-average-service', 'macd-service']
+    for name in single:
+        services[name].delay = SERVICE_DELAY
+
+    started = time.perf_counter()
+    status, body = analyze(gateway)
+    elapsed = time.perf_counter() - started
+
+    assert status == 200, body
+    assert all(len(services[name].calls) == 1 for name in single)
+    assert not services['indicator-service'].calls
+    # Sequential calls would take three delays; concurrent ones overlap
+    assert elapsed < 2 * SERVICE_DELAY
+    spans = [services[name].calls[0] for name in single]
+    assert max(start for start, _ in spans) < min(end for _, end in spans)
+
+
+def test_only_needed_services_are_called(gateway, monkeypatch):
+    gateway, services = gateway
+    monkeypatch.setattr(gateway, 'INDICATOR_SERVICE_URL', '')
+    status, body = analyze(gateway, indicators=['RSI'])
+    assert status == 200, body
+    assert len(services['rsi-service'].calls) == 1
+    assert not services['moving-average-service'].calls and not services['macd-service'].calls
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_slow_service_times_out(gateway, monkeypatch, batch):
+    gateway, services = gateway
+    name = 'indicator-service' if batch else 'rsi-service'
+    if not batch:
+        monkeypatch.setattr(gateway, 'INDICATOR_SERVICE_URL', '')
+    monkeypatch.setattr(gateway, 'SERVICE_TIMEOUT', 0.2)
+    services[name].delay = 1.0
+
+    status, body = analyze(gateway)
+    assert status == 500
+    assert body == {'error': f'{name} did not answer within 0.2s'}
+
+
+@pytest.mark.parametrize('batch', [True, False])
+@pytest.mark.parametrize('timeframe', ['daily', 'weekly', 'monthly'])
+def test_signals_and_graph_match_direct_calculation(gateway, monkeypatch, batch, timeframe):
+    gateway, _ = gateway
+    if not batch:
+        monkeypatch.setattr(gateway, 'INDICATOR_SERVICE_URL', '')
+    snapshot = gateway.reloader.snapshot
+    if timeframe == 'daily':
+        rows = snapshot.index.get('ALK')
+        prices = rows['LastTradePrice']
+    else:
+        rows = snapshot.bars[timeframe].get('ALK')
+        prices = rows['Close']
+    expected = reference_indicators(prices.to_numpy(dtype='float64'))
+
+    status, body = analyze(gateway, timeframe=timeframe)
+
+    assert status == 200, body
+    assert body['signals'] == summarize_signals(signal_series(expected, INDICATORS))
+    traces = json.loads(body['graph'])['data']
+    assert [trace['name'] for trace in traces] == INDICATORS
+    for trace in traces:
+        assert len(trace['x']) == len(rows)
+        np.testing.assert_allclose(trace_values(trace['y']), expected[trace['name']].to_numpy(), rtol=1e-9)
+
+
+def test_daily_series_are_passed_by_reference(gateway):
+    gateway, services = gateway
+    status, body = analyze(gateway)
+    assert status == 200, body
+    # One JSON call naming the company; a version mismatch would add a columnar call with the prices
+    assert services['indicator-service'].content_types == ['application/json']
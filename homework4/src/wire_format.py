@@ -0,0 +1,93 @@
+import json
+import struct
+
+import numpy as np
+
+# Media type of the columnar binary format; JSON stays the default for every route
+CONTENT_TYPE = 'application/vnd.mse.columns'
+
+MAGIC = b'MSEC'
+HEADER = struct.Struct('<4sI')
+
+
+def encode_columns(columns, meta=None):
+    """
+    Encode named numeric columns as one binary payload:
+    'MSEC', the length of a JSON header (little-endian uint32), the header with the column
+    names and lengths and any extra metadata, padding to an 8-byte boundary and then each
+    column as raw little-endian float64 values.
+    """
+    arrays = {name: np.ascontiguousarray(values, dtype='<f8') for name, values in columns.items()}
+    header = json.dumps({'columns': [[name, len(array)] for name, array in arrays.items()],
+                         'meta': meta or {}}).encode('utf-8')
+    header += b' ' * (-(HEADER.size + len(header)) % 8)
+    return b''.join([HEADER.pack(MAGIC, len(header)), header] + [array.tobytes() for array in arrays.values()])
+
+
+def decode_columns(payload):
+    """
+    Decode a payload from encode_columns into ({name: float64 array}, meta). The arrays
+    are read-only views on the payload, without copying.
+    """
+    magic, header_length = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar payload")
+    header = json.loads(payload[HEADER.size:HEADER.size + header_length])
+    columns = {}
+    offset = HEADER.size + header_length
+    for name, length in header['columns']:
+        columns[name] = np.frombuffer(payload, dtype='<f8', count=length, offset=offset)
+        offset += 8 * length
+    return columns, header['meta']
+
+
+def is_columnar(request):
+    """
+    True when a Flask request body is in the columnar format.
+    """
+    return request.mimetype == CONTENT_TYPE
+
+
+def wants_columnar(request):
+    """
+    True when the client of a Flask request prefers the columnar format in its Accept header.
+    """
+    return request.accept_mimetypes.best_match(['application/json', CONTENT_TYPE]) == CONTENT_TYPE
+
+
+def read_prices(request, store=None):
+    """
+    Prices, parameters and data version of an indicator request: a columnar body with a
+    LastTradePrice column and the parameters as metadata, JSON with the rows in 'data', or
+    JSON naming a 'company' (and optionally 'start' and 'end' dates) whose series is read
+    from the shared store. The version is None unless the prices came from the store.
+    """
+    if is_columnar(request):
+        columns, params = decode_columns(request.get_data())
+        return columns['LastTradePrice'], params, None
+    params = request.json
+    if 'company' in params and store is not None:
+        prices, version = store.prices(params['company'], params.get('start'), params.get('end'))
+        return prices, params, version
+    return [row.get('LastTradePrice') for row in params['data']], params, None
+
+
+def columnar_response(columns, meta=None):
+    """
+    Flask response carrying columns in the columnar format.
+    """
+    from flask import Response
+    return Response(encode_columns(columns, meta), mimetype=CONTENT_TYPE)
+
+
+def indicator_response(columns, json_body, version=None):
+    """
+    Response of an indicator route: the columns in the columnar format when the client
+    asks for it, json_body otherwise. The data version of series read from the shared
+    store is returned in the X-Data-Version header.
+    """
+    from flask import jsonify, request
+    response = columnar_response(columns) if wants_columnar(request) else jsonify(json_body)
+    if version is not None:
+        response.headers['X-Data-Version'] = version
+    return response